@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import tracemalloc
+
+from vkr_modules.playlist import Playlist
+from benchmarks.synthetic import playlist_scenarios, generate_stats_folder
+
+# traced memory of the report pipeline over growing stats folders: scenarios are streamed and their runs
+# released once joined into sessions, so past the folder listing only the (small) session aggregates
+# grow with the history.
+# Exits with 1 when the processing peak of the largest folder exceeds --max-growth times the smallest one.
+# usage (from src/): python -m benchmarks.memory --files 10000 40000 --output memory.json
+
+path_resources = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+
+
+def measure_folder(stats_folder, root_folder, workers=None):
+	playlist = Playlist(stats_folder=stats_folder, root_folder=root_folder, workers=workers, resources_folder=path_resources, graphs=False)
+	playlist.generate_folders()
+
+	result = {}
+
+	# cold (every file parsed) and warm (everything from the parse cache), the summaries of the cold run
+	# are deleted first so the warm one streams every file again instead of resuming them
+	for run in ['cold', 'warm']:
+		shutil.rmtree(playlist.path_summaries, ignore_errors=True)
+		tracemalloc.start()
+
+		playlist.open_pipeline()
+		listing = tracemalloc.get_traced_memory()[0]
+		tracemalloc.reset_peak()
+
+		try:
+			playlist.write_reports()
+			current, peak = tracemalloc.get_traced_memory()
+		finally:
+			playlist.close_pipeline()
+			tracemalloc.stop()
+
+		# retained: what is still held once the pages are written (session aggregates), peak: the highest
+		# point above the listing, per-run data included
+		result[run] = {'listing': listing, 'retained': current - listing, 'peak': peak - listing}
+
+	result['files'] = len(playlist.stat_index)
+
+	return result
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Peak memory of the report pipeline')
+	parser.add_argument('--files', type=int, nargs='+', default=[10000, 40000], help='synthetic folder sizes to measure, above Ingestor.batch_size')
+	parser.add_argument('--scenarios', type=int, default=None, help='number of playlist scenarios to use (default: all)')
+	parser.add_argument('--years', type=float, default=2)
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--max-growth', type=float, default=2.0, help='allowed processing peak ratio between the largest and smallest folder')
+	parser.add_argument('--output', default='memory_output.json')
+	args = parser.parse_args()
+
+	report = {
+				'date': datetime.datetime.now().isoformat(timespec='seconds'),
+				'python': sys.version.split()[0],
+				'platform': platform.platform(),
+				'workers': args.workers,
+				'results': []
+	}
+
+	with tempfile.TemporaryDirectory() as tmp:
+		scenario_names = playlist_scenarios(os.path.join(path_resources, 'playlists.json'))[:args.scenarios]
+
+		for n_files in sorted(args.files):
+			stats_folder = os.path.join(tmp, f'stats_{n_files}')
+			generate_stats_folder(stats_folder, n_files, scenario_names, args.years)
+
+			result = measure_folder(stats_folder, os.path.join(tmp, f'root_{n_files}'), args.workers)
+			report['results'].append(result)
+
+			runs = ' | '.join(f'{run}: listing {result[run]["listing"]/2**20:.1f} MiB, retained {result[run]["retained"]/2**20:.1f} MiB, peak {result[run]["peak"]/2**20:.1f} MiB' for run in ['cold', 'warm'])
+			print(f'{result["files"]} files | {runs}')
+
+	with open(args.output, 'w') as fp:
+		json.dump(report, fp, indent=4)
+
+	print(f'results written to {args.output}')
+
+	smallest, largest = report['results'][0], report['results'][-1]
+	growth = max(largest[run]['peak'] / smallest[run]['peak'] for run in ['cold', 'warm'])
+
+	if growth > args.max_growth:
+		print(f'processing peak grew {growth:.2f}x from {smallest["files"]} to {largest["files"]} files (allowed: {args.max_growth}x)')
+		return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
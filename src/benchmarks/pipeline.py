@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import tempfile
+
+from vkr_modules.playlist import Playlist
+from vkr_modules.stat_index import StatIndex
+from vkr_modules.ingest import Ingestor
+from vkr_modules.runs import RunBatch
+from vkr_modules.scenario_registry import ScenarioRegistry
+from vkr_modules.graphs import GraphRenderer
+from benchmarks.synthetic import playlist_scenarios, generate_stats_folder
+
+# times every stage of Playlist.generate_reports separately and writes the results as JSON
+# usage (from src/): python -m benchmarks.pipeline --files 1000 10000 --output bench.json
+
+path_resources = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+
+
+class StageTimer:
+	def __init__(self):
+		self.stages = dict()
+
+	def time(self, stage, function, *args):
+		t0 = time.perf_counter()
+		result = function(*args)
+		self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - t0
+
+		return result
+
+
+def benchmark_folder(stats_folder, root_folder, workers=None, graphs=True, charts=None):
+	timer = StageTimer()
+
+	playlist = Playlist(stats_folder=stats_folder, root_folder=root_folder, workers=workers, resources_folder=path_resources, graphs=graphs, charts=charts)
+	playlist.generate_folders()
+	playlist.copy_assets()
+
+	playlists = playlist.get_playlists()
+	scenario_types = {scenario_name: playlists.get_scenario_type(scenario_name) for scenario_name in playlists.get_scenario_names()}
+
+	# listing
+	stat_index = timer.time('listing', StatIndex, stats_folder)
+
+	# parsing, cold (no parse cache)
+	ingestor = Ingestor(stats_folder, None, workers)
+	registry = ScenarioRegistry(stat_index, ingestor)
+	stat_files = [sf for scenario_name in scenario_types for sf in stat_index.get_files(scenario_name)]
+	timer.time('parsing', ingestor.ingest, stat_files)
+
+	# session joining and trends, per scenario as Scenario.process does it
+	for scenario_name, scenario_type in scenario_types.items():
+		scenario = registry.get_scenario(scenario_name, Playlist.session_thresholds[scenario_type])
+		scenario_files = stat_index.get_files(scenario_name)
+
+		if len(scenario_files) == 0:
+			registry.scenarios_data[scenario_name] = None
+			continue
+
+		runs = timer.time('parsing', lambda: RunBatch.from_runs(ingestor.load(scenario_files)))
+		sessions = timer.time('session_joining', scenario.join_sessions, runs)
+
+		registry.scenarios_data[scenario_name] = timer.time('trends', scenario.summarize, sessions)
+
+	# graphing, from scratch (js charts are drawn by the browser, their payload is part of html)
+	if graphs and playlist.charts == Playlist.charts_png:
+		renderer = GraphRenderer(playlist.path_imgs, workers)
+		jobs = [(name, data['all'], 20, Playlist.color_style[scenario_types[name]]) for name, data in registry.scenarios_data.items() if data is not None]
+		timer.time('graphing', renderer.render, jobs)
+		renderer.close()
+
+	# html, with every scenario already processed and graphed
+	registry.graphed = set(registry.scenarios_data)
+	playlist.stat_index = stat_index
+	playlist.ingestor = ingestor
+	playlist.registry = registry
+	if graphs and playlist.charts == Playlist.charts_png:
+		playlist.graph_renderer = GraphRenderer(playlist.path_imgs, workers)
+	timer.time('html', playlist.write_reports)
+	ingestor.close()
+
+	result = {
+				'files': len(stat_index),
+				'scenarios': sum(1 for data in registry.scenarios_data.values() if data is not None),
+				'sessions': sum(len(data['all']) for data in registry.scenarios_data.values() if data is not None),
+				'stages': {stage: round(seconds, 4) for stage, seconds in timer.stages.items()}
+	}
+	result['total'] = round(sum(timer.stages.values()), 4)
+
+	return result
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Per-stage timings of the report pipeline')
+	parser.add_argument('--files', type=int, nargs='+', default=[1000, 10000], help='synthetic folder sizes to benchmark')
+	parser.add_argument('--scenarios', type=int, default=None, help='number of playlist scenarios to use (default: all)')
+	parser.add_argument('--years', type=float, default=2)
+	parser.add_argument('--stats-folder', default=None, help='benchmark an existing stats folder instead')
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--no-graphs', action='store_true')
+	parser.add_argument('--charts', choices=[Playlist.charts_png, Playlist.charts_js], default=Playlist.charts_png)
+	parser.add_argument('--output', default='bench_output.json')
+	args = parser.parse_args()
+
+	report = {
+				'date': datetime.datetime.now().isoformat(timespec='seconds'),
+				'python': sys.version.split()[0],
+				'platform': platform.platform(),
+				'cpus': os.cpu_count(),
+				'workers': args.workers,
+				'charts': args.charts,
+				'results': []
+	}
+
+	with tempfile.TemporaryDirectory() as tmp:
+		if args.stats_folder is not None:
+			runs = [(args.stats_folder, None)]
+		else:
+			scenario_names = playlist_scenarios(os.path.join(path_resources, 'playlists.json'))[:args.scenarios]
+			runs = []
+			for n_files in args.files:
+				stats_folder = os.path.join(tmp, f'stats_{n_files}')
+				generate_stats_folder(stats_folder, n_files, scenario_names, args.years)
+				runs.append((stats_folder, n_files))
+
+		for stats_folder, n_files in runs:
+			root_folder = os.path.join(tmp, f'root_{n_files}')
+			os.makedirs(root_folder)
+
+			result = benchmark_folder(stats_folder, root_folder, args.workers, not args.no_graphs, args.charts)
+			report['results'].append(result)
+
+			stages = ', '.join(f'{stage} {seconds:.3f}s' for stage, seconds in result['stages'].items())
+			print(f'{result["files"]} files: {stages} | total {result["total"]:.3f}s')
+
+	with open(args.output, 'w') as fp:
+		json.dump(report, fp, indent=4)
+
+	print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,127 @@
+import sys
+import time
+import random
+import argparse
+import datetime
+import statistics
+
+import numpy as np
+
+from vkr_modules.runs import RunBatch
+from vkr_modules.sessions import SessionJoiner
+
+# session joining against the pop-based loop it replaced, on randomized run lists
+# usage (from src/): python -m benchmarks.sessions --lists 300 --runs 2000
+
+
+def legacy_join_sessions(scenario_data_list, time_threshold=datetime.timedelta(hours=2)):
+	scenario_data_cleaned = []
+
+	while len(scenario_data_list) > 0:
+		data0 = scenario_data_list.pop(0)
+
+		to_be_joined = [data0]
+		i = 0
+		while i < len(scenario_data_list):
+			if abs(scenario_data_list[i]['date'] - data0['date']) <= time_threshold:
+				to_be_joined.append(scenario_data_list[i])
+				scenario_data_list.pop(i)
+			else:
+				i += 1
+
+		session_average = {key: statistics.mean([sd[key] for sd in to_be_joined]) for key in RunBatch.fields}
+		session_average['date'] = datetime.datetime.fromtimestamp(statistics.mean([sd['date'].timestamp() for sd in to_be_joined]))
+
+		scenario_data_cleaned.append(session_average)
+
+	return scenario_data_cleaned
+
+
+def random_runs(n_runs, rng):
+	# sessions of a few runs minutes apart, hours to weeks between sessions, some runs seconds apart
+	runs = []
+	date = datetime.datetime(2021, 1, 1) + datetime.timedelta(seconds=rng.randint(0, 10**7))
+
+	while len(runs) < n_runs:
+		for _ in range(rng.randint(1, 12)):
+			date += datetime.timedelta(seconds=rng.choice([1, rng.randint(30, 900), rng.randint(900, 5400)]))
+			runs.append({'date': date, 'shots': rng.randint(50, 400), 'hits': rng.randint(0, 50), 'accuracy': rng.random(),
+							'dmg_done': rng.uniform(0, 5000), 'dmg_possible': rng.uniform(0, 5000), 'kills': rng.randint(0, 80),
+							'avg_ttk': rng.random(), 'score': rng.uniform(500, 3000)})
+
+		date += datetime.timedelta(seconds=rng.randint(3600, 14 * 86400))
+
+	return runs[:n_runs]
+
+
+def joiner_sessions(runs, time_threshold, batch_size, rng):
+	# batches in date order, like the ingestor's, but the runs inside each one unsorted
+	joiner = SessionJoiner(time_threshold)
+
+	for i in range(0, len(runs), batch_size):
+		batch = runs[i:i+batch_size]
+		rng.shuffle(batch)
+		joiner.add(RunBatch.from_runs(batch))
+
+	closed = joiner.drain()
+	last = joiner.finish()
+
+	return RunBatch(np.concatenate((closed, last.array)))
+
+
+def agree(legacy, sessions):
+	if len(legacy) != len(sessions):
+		return False
+
+	for field in RunBatch.fields:
+		if not np.allclose([session[field] for session in legacy], sessions[field], rtol=1e-9, atol=0):
+			return False
+
+	# the legacy dates went through float timestamps
+	legacy_dates = np.array([session['date'] for session in legacy], dtype='datetime64[us]')
+
+	return bool(np.all(np.abs(legacy_dates - sessions['date']) <= np.timedelta64(1, 'ms')))
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Session joining check and micro-benchmark')
+	parser.add_argument('--lists', type=int, default=300, help='randomized run lists to compare')
+	parser.add_argument('--runs', type=int, default=2000, help='largest run list')
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	legacy_time = new_time = 0
+	mismatches = 0
+
+	for i in range(args.lists):
+		runs = random_runs(rng.randint(1, args.runs), rng)
+		time_threshold = datetime.timedelta(minutes=rng.choice([30, 60, 120, 240]))
+		batch_size = rng.randint(1, len(runs))
+
+		# the legacy loop took the runs in date order, as StatIndex lists them
+		t0 = time.perf_counter()
+		legacy = legacy_join_sessions(sorted(runs, key=lambda run: run['date']), time_threshold)
+		t1 = time.perf_counter()
+		sessions = joiner_sessions(list(runs), time_threshold, batch_size, rng)
+		t2 = time.perf_counter()
+
+		legacy_time += t1 - t0
+		new_time += t2 - t1
+
+		if not agree(legacy, sessions):
+			mismatches += 1
+			print(f'list {i}: {len(runs)} runs, threshold {time_threshold}, batches of {batch_size}: sessions disagree')
+
+	if mismatches > 0:
+		print(f'{mismatches} of {args.lists} run lists disagree')
+		sys.exit(1)
+
+	print(f'{args.lists} run lists, up to {args.runs} runs each')
+	print(f'legacy join_sessions: {legacy_time*1000:.1f} ms')
+	print(f'SessionJoiner:        {new_time*1000:.1f} ms')
+	print(f'speedup:              {legacy_time/new_time:.2f}x')
+
+
+if __name__ == '__main__':
+	main()
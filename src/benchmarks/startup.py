@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+import platform
+import datetime
+import subprocess
+
+# cold import time of the entry points, each measured in a fresh interpreter, and which heavy
+# dependencies every import drags in before any report is generated
+# usage (from src/): python -m benchmarks.startup --repeat 5 --output startup.json
+
+path_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+modules = ['main', 'cli', 'vkr_modules.playlist', 'vkr_modules.graphs']
+heavy = ['numpy', 'matplotlib', 'scipy', 'PIL', 'tkinter']
+
+probe = '''
+import sys, time, json, importlib
+t0 = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - t0
+print(json.dumps({'elapsed': elapsed, 'loaded': [m for m in sys.argv[2:] if m in sys.modules]}))
+'''
+
+
+def measure_import(module, repeat=5):
+	# best of n, the first runs also pay for the OS file cache
+	times = []
+	loaded = []
+
+	for _ in range(repeat):
+		output = subprocess.run([sys.executable, '-c', probe, module] + heavy, cwd=path_src, capture_output=True, text=True, check=True).stdout
+		result = json.loads(output.strip().splitlines()[-1])
+
+		times.append(result['elapsed'])
+		loaded = result['loaded']
+
+	return {'module': module, 'best': round(min(times), 4), 'times': [round(t, 4) for t in times], 'loaded': loaded}
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Cold import time of the entry points')
+	parser.add_argument('--modules', nargs='+', default=modules)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--output', default='startup_output.json')
+	args = parser.parse_args()
+
+	report = {
+				'date': datetime.datetime.now().isoformat(timespec='seconds'),
+				'python': sys.version.split()[0],
+				'platform': platform.platform(),
+				'results': []
+	}
+
+	for module in args.modules:
+		result = measure_import(module, args.repeat)
+		report['results'].append(result)
+
+		print(f'{module}: {result["best"]*1000:.1f} ms | loads {", ".join(result["loaded"]) or "nothing heavy"}')
+
+	with open(args.output, 'w') as fp:
+		json.dump(report, fp, indent=4)
+
+	print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+	main()
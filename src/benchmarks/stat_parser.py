@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from vkr_modules.stat_parser import parse_stat_file
+from benchmarks.synthetic import write_stat_file
+
+# micro-benchmark of the stat file parser against the line-by-line parser it replaced
+# usage (from src/): python -m benchmarks.stat_parser --files 2000 --kills 60
+
+
+def legacy_parse_file(file_path):
+	with open(file_path, 'r') as fp:
+		block = 1
+		for line in fp:
+			if line == '\n':
+				block += 1
+			else:
+				if block == 2:
+					if 'Weapon,Shots,Hits,Damage Done,Damage Possible' in line:
+						pass
+					else:
+						split = line.strip('n').split(',')
+
+						shots = int(split[1])
+						hits = int(split[2])
+						accuracy = hits/shots if shots > 0 else 1
+						dmg_done = float(split[3])
+						dmg_possible = float(split[4])
+
+				elif block == 3:
+					if 'Kills:,' in line:
+						kills = int(line.strip('\n').split(',')[1])
+					elif 'Avg TTK:,' in line:
+						avg_ttk = float(line.strip('\n').split(',')[1])
+					elif 'Score:,' in line:
+						score = float(line.strip('\n').split(',')[1])
+
+	return {'shots': shots, 'hits': hits, 'accuracy': accuracy, 'dmg_done': dmg_done, 'dmg_possible': dmg_possible,
+			'kills': kills, 'avg_ttk': avg_ttk, 'score': score}
+
+
+def time_parser(parser, paths, repeat):
+	best = None
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		results = [parser(path) for path in paths]
+		elapsed = time.perf_counter() - t0
+		best = elapsed if best is None else min(best, elapsed)
+
+	return best, results
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Stat file parser micro-benchmark')
+	parser.add_argument('--files', type=int, default=2000)
+	parser.add_argument('--kills', type=int, default=60, help='kill log length of each file')
+	parser.add_argument('--repeat', type=int, default=3)
+	args = parser.parse_args()
+
+	rng = random.Random(0)
+
+	with tempfile.TemporaryDirectory() as folder:
+		paths = [os.path.join(folder, f'{i}.csv') for i in range(args.files)]
+		for path in paths:
+			write_stat_file(path, args.kills, rng)
+
+		legacy_time, legacy_results = time_parser(legacy_parse_file, paths, args.repeat)
+		new_time, new_results = time_parser(parse_stat_file, paths, args.repeat)
+
+	if legacy_results != new_results:
+		print('parsers disagree')
+		sys.exit(1)
+
+	print(f'{args.files} files, {args.kills} kills each')
+	print(f'legacy parser: {legacy_time*1000:.1f} ms ({legacy_time/args.files*1e6:.1f} us/file)')
+	print(f'stat_parser:   {new_time*1000:.1f} ms ({new_time/args.files*1e6:.1f} us/file)')
+	print(f'speedup:       {legacy_time/new_time:.2f}x')
+
+
+if __name__ == '__main__':
+	main()
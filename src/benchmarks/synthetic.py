@@ -0,0 +1,88 @@
+import os
+import random
+import argparse
+import datetime
+
+from vkr_modules.playlist_registry import PlaylistRegistry
+
+# synthetic KovaaK's stats folders, with the same file names and layout the game writes
+# usage (from src/): python -m benchmarks.synthetic <folder> --files 10000 --scenarios 150 --years 3
+
+
+def playlist_scenarios(playlists_json):
+	return PlaylistRegistry([playlists_json]).get_scenario_names()
+
+
+def stat_filename(scenario_name, date):
+	return f'{scenario_name} - Challenge - {date:%Y.%m.%d-%H.%M.%S} Stats.csv'
+
+
+def write_stat_file(file_path, n_kills, rng, score=None):
+	shots = rng.randint(50, 400)
+	hits = rng.randint(0, shots)
+	score = rng.uniform(500, 3000) if score is None else score
+
+	with open(file_path, 'w') as fp:
+		fp.write('Kill #,Timestamp,Bot,Weapon,TTK,Shots,Hits,Accuracy,Damage Done,Damage Possible,Efficiency,Cheated,OverShots\n')
+		for k in range(n_kills):
+			fp.write(f'{k+1},12:00:{k%60:02d}.000,Target,LG,0.{rng.randint(100, 999)}s,3,1,0.333333,100.0,100.0,1.0,false,0\n')
+
+		fp.write('\nWeapon,Shots,Hits,Damage Done,Damage Possible,,,\n')
+		fp.write(f'LG,{shots},{hits},{hits*10.0},{shots*10.0},,,\n')
+
+		fp.write(f'\nKills:,{n_kills}\nDeaths:,0\nFight Time:,60.0\nAvg TTK:,{rng.random():.6f}\nDamage Done:,{hits*10.0}\n')
+		fp.write('Damage Taken:,0.0\nMidairs:,0\nMidaired:,0\nDirects:,0\nDirected:,0\nDistance Traveled:,0.0\n')
+		fp.write(f'Score:,{score:.6f}\nScenario:,Benchmark\nHash:,0\nGame Version:,3.0\n')
+		fp.write('Challenge Start:,12:00:00.000\nInput Lag:,0\nMax FPS (config):,240\nSens Scale:,cm/360\nHoriz Sens:,40\nVert Sens:,40\nFOV:,103\n')
+
+
+def generate_stats_folder(folder, n_files, scenario_names, years=2, n_kills=40, seed=0, end=None):
+	# runs are played in sessions: a few consecutive runs of one scenario, minutes apart,
+	# with scores slowly improving over the covered period
+	rng = random.Random(seed)
+	end = datetime.datetime(2022, 1, 1) if end is None else end
+	start = end - datetime.timedelta(days=365*years)
+	span = (end - start).total_seconds()
+
+	os.makedirs(folder, exist_ok=True)
+
+	written = 0
+	while written < n_files:
+		scenario_name = rng.choice(scenario_names)
+		date = start + datetime.timedelta(seconds=rng.uniform(0, span))
+		progress = (date - start).total_seconds() / span
+
+		for _ in range(min(rng.randint(1, 8), n_files - written)):
+			date += datetime.timedelta(seconds=rng.randint(70, 240))
+			score = rng.gauss(1000 + 1500*progress, 150)
+
+			file_path = os.path.join(folder, stat_filename(scenario_name, date))
+			if os.path.exists(file_path):
+				continue
+
+			write_stat_file(file_path, n_kills, rng, score)
+			written += 1
+
+	return written
+
+
+def main():
+	resources = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+
+	parser = argparse.ArgumentParser(description='Generate a synthetic KovaaK\'s stats folder')
+	parser.add_argument('folder')
+	parser.add_argument('--files', type=int, default=1000)
+	parser.add_argument('--scenarios', type=int, default=None, help='number of playlist scenarios to use (default: all)')
+	parser.add_argument('--years', type=float, default=2)
+	parser.add_argument('--kills', type=int, default=40, help='kill log length of each file')
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+
+	scenario_names = playlist_scenarios(os.path.join(resources, 'playlists.json'))[:args.scenarios]
+	written = generate_stats_folder(args.folder, args.files, scenario_names, args.years, args.kills, args.seed)
+
+	print(f'{written} stat files for {len(scenario_names)} scenarios written to {args.folder}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import concurrent.futures
+
+from vkr_modules.playlist import Playlist
+from vkr_modules.team import TeamReport
+from vkr_modules.server import ReportServer
+from vkr_modules.instrumentation import Instrumentation
+from vkr_modules.exceptions import ServerError
+
+# headless entry point, shares the Playlist pipeline with the GUI but never imports tkinter/PIL,
+# --no-graphs and --charts js also keep matplotlib/scipy out
+# usage: python cli.py <stats folder> [<stats folder> ...] --output <folder> [<folder> ...]
+#        python cli.py --team <name>=<stats folder> [<name>=<stats folder> ...] --output <folder>
+#        python cli.py <stats folder> --serve [--port <port>] --output <folder>
+
+
+def resources_folder():
+	if getattr(sys, 'frozen', False):
+		return os.path.join(os.path.dirname(sys.executable), 'resources')
+
+	return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+
+
+def generate_report(stats_folder, output_folder, workers=None, profile=False, trace_memory=False, graphs=True, charts=None, playlists=None, compact=False, graph_resolution=None):
+	t0 = time.perf_counter()
+
+	instrumentation = Instrumentation(profile=profile or None, trace_memory=trace_memory or None)
+	playlist = Playlist(stats_folder=stats_folder, root_folder=output_folder, workers=workers,
+						instrumentation=instrumentation, resources_folder=resources_folder(), graphs=graphs, charts=charts, playlists=playlists, graph_resolution=graph_resolution)
+	playlist.generate_folders()
+	if compact:
+		playlist.compact()
+	playlist.generate_reports()
+
+	return time.perf_counter() - t0
+
+
+def team_report(players, output_folder, workers=None, profile=False, trace_memory=False, graphs=True, playlists=None, graph_resolution=None):
+	t0 = time.perf_counter()
+
+	instrumentation = Instrumentation(profile=profile or None, trace_memory=trace_memory or None)
+	report = TeamReport(players=players, root_folder=output_folder, workers=workers, instrumentation=instrumentation,
+						resources_folder=resources_folder(), graphs=graphs, playlists=playlists, graph_resolution=graph_resolution)
+	report.generate_folders()
+	report.generate_reports()
+
+	return time.perf_counter() - t0
+
+
+def serve_report(stats_folder, output_folder, port=None, workers=None, graphs=True, charts=None, playlists=None, compact=False, graph_resolution=None):
+	playlist = Playlist(stats_folder=stats_folder, root_folder=output_folder, workers=workers,
+						resources_folder=resources_folder(), graphs=graphs, charts=charts, playlists=playlists, graph_resolution=graph_resolution)
+	playlist.generate_folders()
+	if compact:
+		playlist.compact()
+
+	def on_update(pages):
+		labels = [playlist.get_playlists().page_label(*page) for page in pages]
+		print(f'{time.strftime("%H:%M:%S")} new stats for: {", ".join(labels) if len(labels) > 0 else "no playlist scenario"}')
+
+	try:
+		ReportServer(playlist, port).serve(lambda url: print(f'{stats_folder}: serving the report on {url} (Ctrl+C to stop)'), on_update)
+	except KeyboardInterrupt:
+		pass
+	except ServerError as e:
+		print(f'{stats_folder}: {e}', file=sys.stderr)
+		return 1
+
+	return 0
+
+
+def team_players(stats_folders):
+	# NAME=PATH, or just PATH named after its folder
+	players = []
+
+	for entry in stats_folders:
+		name, separator, path = entry.partition('=')
+		if separator == '' or os.path.isdir(entry):
+			name, path = os.path.basename(os.path.normpath(entry)), entry
+
+		players.append((name, path))
+
+	return players
+
+
+def watch_report(stats_folder, output_folder, workers=None, graphs=True, charts=None, playlists=None, compact=False, graph_resolution=None):
+	playlist = Playlist(stats_folder=stats_folder, root_folder=output_folder, workers=workers,
+						resources_folder=resources_folder(), graphs=graphs, charts=charts, playlists=playlists, graph_resolution=graph_resolution)
+	playlist.generate_folders()
+	if compact:
+		playlist.compact()
+
+	def on_update(pages):
+		labels = [playlist.get_playlists().page_label(*page) for page in pages]
+		print(f'{time.strftime("%H:%M:%S")} updated: {", ".join(labels) if len(labels) > 0 else "no playlist scenario"}')
+
+	print(f'{stats_folder}: watching for new stat files, report in {output_folder} (Ctrl+C to stop)')
+
+	try:
+		playlist.watch(on_update)
+	except KeyboardInterrupt:
+		# the pipeline is closed (parse cache, graph manifest, timings) on the way out
+		pass
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description='Generate Voltaic KovaaK\'s reports without the GUI.')
+	parser.add_argument('stats_folders', nargs='+', metavar='STATS_FOLDER', help='KovaaK\'s stats folder, one per player')
+	parser.add_argument('-o', '--output', nargs='+', default=None, metavar='OUTPUT_FOLDER',
+						help='report folder for each stats folder, in the same order (default: current folder, single stats folder only)')
+	parser.add_argument('-j', '--jobs', type=int, default=None, help='reports generated concurrently (default: one per stats folder, up to the CPU count)')
+	parser.add_argument('-w', '--workers', type=int, default=None, help='parse/render workers per report (default: CPUs shared between jobs)')
+	parser.add_argument('--no-graphs', action='store_true', help='data-only pages, skips graphing (matplotlib/scipy are never loaded)')
+	parser.add_argument('-p', '--playlist', action='append', default=None, metavar='PLAYLIST_JSON',
+						help='benchmark playlist to report on, repeat for several (default: the bundled Voltaic playlist)')
+	parser.add_argument('--charts', choices=['png', 'js'], default='png', help='png: matplotlib images, js: session data drawn by the browser (much faster, smaller output)')
+	parser.add_argument('--graph-resolution', choices=['auto', 'day', 'week', 'full'], default=None,
+						help='png graphs of long histories: auto averages them down to 500 points (default), day/week average each day/week, full draws every session')
+	parser.add_argument('--compact', action='store_true',
+						help='fold stat files into the compressed run archive first, later reports only read files newer than it')
+	parser.add_argument('--team', action='store_true',
+						help='one comparison report of every stats folder (given as NAME=PATH or PATH), parsed in a single pass')
+	parser.add_argument('--serve', action='store_true',
+						help='serve the report on localhost instead of writing it, pages are rendered when first opened and refreshed with new stat files (single stats folder)')
+	parser.add_argument('--port', type=int, default=ReportServer.port, help=f'--serve port (default: {ReportServer.port})')
+	parser.add_argument('--watch', action='store_true', help='keep running and update the pages of scenarios with new stat files (single stats folder)')
+	parser.add_argument('--profile', action='store_true', help='capture a cProfile of each run next to timings.json')
+	parser.add_argument('--trace-memory', action='store_true', help='record peak memory with tracemalloc')
+
+	args = parser.parse_args(argv)
+
+	if args.team:
+		args.players = team_players(args.stats_folders)
+		args.stats_folders = [path for _, path in args.players]
+
+		if len(set(name for name, _ in args.players)) != len(args.players):
+			parser.error('--team player names must be unique')
+		if args.watch or args.compact:
+			parser.error('--team cannot be combined with --watch or --compact')
+		if args.charts != 'png':
+			parser.error('--team only draws png graphs')
+		if args.output is not None and len(args.output) != 1:
+			parser.error('--team writes a single report, give one output folder')
+		if args.output is None:
+			args.output = [os.getcwd()]
+
+	if args.output is None:
+		if len(args.stats_folders) > 1:
+			parser.error('--output is required when generating several reports')
+		args.output = [os.getcwd()]
+
+	if not args.team and len(args.output) != len(args.stats_folders):
+		parser.error(f'{len(args.stats_folders)} stats folders but {len(args.output)} output folders')
+
+	if args.watch and len(args.stats_folders) > 1:
+		parser.error('--watch takes a single stats folder')
+
+	if args.serve and (len(args.stats_folders) > 1 or args.team or args.watch):
+		parser.error('--serve takes a single stats folder, without --team or --watch')
+
+	for path_playlist in args.playlist if args.playlist is not None else []:
+		if not os.path.isfile(path_playlist):
+			parser.error(f'playlist not found: {path_playlist}')
+
+	for stats_folder in args.stats_folders:
+		if not os.path.isdir(stats_folder):
+			parser.error(f'stats folder not found: {stats_folder}')
+
+	return args
+
+
+def main(argv=None):
+	args = parse_args(argv)
+	cpus = os.cpu_count() or 1
+
+	jobs = args.jobs if args.jobs is not None else min(len(args.stats_folders), cpus)
+	jobs = max(1, min(jobs, len(args.stats_folders)))
+	workers = args.workers if args.workers is not None else max(1, cpus // jobs)
+
+	if args.team:
+		output_folder = os.path.abspath(args.output[0])
+		try:
+			elapsed = team_report(args.players, output_folder, args.workers, args.profile, args.trace_memory, not args.no_graphs, args.playlist, args.graph_resolution)
+		except Exception as e:
+			print(f'team report failed: {e}', file=sys.stderr)
+			return 1
+
+		print(f'team report of {len(args.players)} players written to {output_folder} ({elapsed:.1f} s)')
+		return 0
+
+	if args.serve:
+		return serve_report(args.stats_folders[0], os.path.abspath(args.output[0]), args.port, args.workers, not args.no_graphs, args.charts, args.playlist, args.compact, args.graph_resolution)
+
+	if args.watch:
+		watch_report(args.stats_folders[0], os.path.abspath(args.output[0]), args.workers, not args.no_graphs, args.charts, args.playlist, args.compact, args.graph_resolution)
+		return 0
+
+	reports = list(zip(args.stats_folders, [os.path.abspath(output) for output in args.output]))
+	failed = 0
+
+	if jobs == 1:
+		for stats_folder, output_folder in reports:
+			try:
+				elapsed = generate_report(stats_folder, output_folder, workers, args.profile, args.trace_memory, not args.no_graphs, args.charts, args.playlist, args.compact, args.graph_resolution)
+				print(f'{stats_folder}: report written to {output_folder} ({elapsed:.1f} s)')
+			except Exception as e:
+				failed += 1
+				print(f'{stats_folder}: failed: {e}', file=sys.stderr)
+	else:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+			futures = {executor.submit(generate_report, stats_folder, output_folder, workers, args.profile, args.trace_memory, not args.no_graphs, args.charts, args.playlist, args.compact, args.graph_resolution): (stats_folder, output_folder)
+						for stats_folder, output_folder in reports}
+
+			for future in concurrent.futures.as_completed(futures):
+				stats_folder, output_folder = futures[future]
+				try:
+					print(f'{stats_folder}: report written to {output_folder} ({future.result():.1f} s)')
+				except Exception as e:
+					failed += 1
+					print(f'{stats_folder}: failed: {e}', file=sys.stderr)
+
+	return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+	multiprocessing.freeze_support()
+	sys.exit(main())
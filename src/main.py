@@ -1,11 +1,13 @@
 import os
+import queue
+import threading
+import webbrowser
+import multiprocessing
 
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 
-from PIL import Image, ImageTk
-
-from vkr_modules.playlist import Playlist
+from vkr_modules.exceptions import GenerationCancelled
 
 
 class VoltaicKovaaksReport:
@@ -33,12 +35,45 @@ class VoltaicKovaaksReport:
 		button_browse = tk.Button(master=self.window, text='Browse Folder', command=self.browse_folder)
 		button_browse.grid(column=0, row=2, sticky=tk.W, padx=10)
 
-		button_generate = tk.Button(master=self.window, text='Generate Report', command=self.generate_report)
-		button_generate.grid(column=0, row=4, sticky=tk.W, padx=10)
+		self.graphs = tk.BooleanVar(master=self.window, value=True)
+		check_graphs = tk.Checkbutton(master=self.window, text='Graphs', variable=self.graphs)
+		check_graphs.grid(column=1, row=2, sticky=tk.W)
+
+		# charts drawn by the browser from the session data instead of matplotlib images
+		self.browser_charts = tk.BooleanVar(master=self.window, value=False)
+		check_browser_charts = tk.Checkbutton(master=self.window, text='Browser charts (faster)', variable=self.browser_charts)
+		check_browser_charts.grid(column=2, row=2, sticky=tk.W)
+
+		# keeps the report open after generating it and updates the pages of newly played scenarios
+		self.watch = tk.BooleanVar(master=self.window, value=False)
+		check_watch = tk.Checkbutton(master=self.window, text='Watch stats folder', variable=self.watch)
+		check_watch.grid(column=1, row=3, sticky=tk.W)
+
+		self.button_generate = tk.Button(master=self.window, text='Generate Report', command=self.generate_report)
+		self.button_generate.grid(column=0, row=4, sticky=tk.W, padx=10)
+
+		# progress of a running generation, fed by the worker thread through self.events
+		self.progressbar = ttk.Progressbar(master=self.window, orient=tk.HORIZONTAL, length=300, mode='determinate')
+		self.progressbar.grid(column=1, row=4, sticky=tk.W)
+
+		self.button_cancel = tk.Button(master=self.window, text='Cancel', command=self.cancel_report, state=tk.DISABLED)
+		self.button_cancel.grid(column=0, row=5, sticky=tk.W, padx=10)
+
+		self.button_open = tk.Button(master=self.window, text='Open Report', command=self.open_report, state=tk.DISABLED)
+		self.button_open.grid(column=0, row=6, sticky=tk.W, padx=10)
+
+		self.text_progress = tk.StringVar()
+		label_progress = tk.Label(master=self.window, textvariable=self.text_progress)
+		label_progress.grid(column=1, row=5, sticky=tk.W)
 
-		img_teto = Image.open('resources/kasane_teto.png')
-		photoimg_teto = ImageTk.PhotoImage(img_teto)
-		label_teto = tk.Label(image=photoimg_teto)
+		self.worker = None
+		self.events = queue.Queue()
+		self.cancel_event = threading.Event()
+		self.path_index = None
+
+		# tk reads PNGs itself (Tk 8.6), PIL is only needed later by matplotlib
+		self.photoimg_teto = tk.PhotoImage(master=self.window, file='resources/kasane_teto.png')
+		label_teto = tk.Label(image=self.photoimg_teto)
 		label_teto.place(x=sizex, y=sizey, anchor=tk.SE)
 
 		# label_teto.grid(column=3, row=3)
@@ -55,18 +90,102 @@ class VoltaicKovaaksReport:
 	def generate_report(self):
 		if self.text_statfolder_path.get() == '':
 			messagebox.showerror('Error', 'Set your KovaaK\'s Stat folder before generating a report.')
-		else:
+		elif self.worker is None:
+			# the pipeline (numpy, sqlite3, ...) is imported on first use so the window shows up right away
+			from vkr_modules.playlist import Playlist
+
 			# playlist = Playlist(stats_folder=self.text_statfolder_path.get(), root_folder=os.path.dirname(__file__))
-			playlist = Playlist(stats_folder=self.text_statfolder_path.get(), root_folder=os.getcwd())
+			playlist = Playlist(stats_folder=self.text_statfolder_path.get(), root_folder=os.getcwd(),
+								progress=self.events.put, cancel_event=self.cancel_event, graphs=self.graphs.get(),
+								charts=Playlist.charts_js if self.browser_charts.get() else Playlist.charts_png)
+			self.path_index = playlist.path_index
+
+			self.cancel_event.clear()
+			self.button_generate.config(state=tk.DISABLED)
+			self.button_cancel.config(state=tk.NORMAL)
+			self.button_open.config(state=tk.DISABLED)
+			self.progressbar['value'] = 0
+			self.text_progress.set('Reading stat files...')
+
+			self.worker = threading.Thread(target=self.run_playlist, args=(playlist, self.watch.get()), daemon=True)
+			self.worker.start()
+			self.window.after(100, self.poll_progress)
+
+	def run_playlist(self, playlist, watch):
+		# runs on the worker thread, tk widgets are only touched from poll_progress
+		try:
 			playlist.generate_folders()
-			playlist.generate_reports()
-
+			if watch:
+				# returns once Cancel is pressed
+				playlist.watch()
+				self.events.put({'event': 'stopped'})
+			else:
+				playlist.generate_reports()
+				self.events.put({'event': 'done'})
+		except GenerationCancelled:
+			self.events.put({'event': 'cancelled'})
+		except Exception as e:
+			self.events.put({'event': 'error', 'error': e})
+
+	def poll_progress(self):
+		finished = False
+
+		while not self.events.empty():
+			event = self.events.get()
+
+			if event['event'] in ('scenario', 'rank'):
+				self.progressbar['maximum'] = event['total']
+				self.progressbar['value'] = event['done']
+
+				if event['event'] == 'rank':
+					# finished rank pages can be opened while the rest is generated
+					self.button_open.config(state=tk.NORMAL)
+					self.text_progress.set(f'{event["name"]} page ready')
+				else:
+					self.text_progress.set(event['name'])
+			elif event['event'] == 'watching':
+				self.progressbar['value'] = self.progressbar['maximum']
+				self.button_open.config(state=tk.NORMAL)
+				self.text_progress.set('Up to date, watching for new stat files')
+			else:
+				finished = True
+				self.finish_report(event)
+
+		if not finished:
+			self.window.after(100, self.poll_progress)
+
+	def finish_report(self, event):
+		self.worker = None
+		self.button_generate.config(state=tk.NORMAL)
+		self.button_cancel.config(state=tk.DISABLED)
+
+		if event['event'] == 'done':
+			self.progressbar['value'] = self.progressbar['maximum']
+			self.text_progress.set('Done')
 			messagebox.showinfo('Operation completed', 'Generated in report.html\nFeel free to close this application.')
+		elif event['event'] == 'stopped':
+			self.text_progress.set('Stopped watching')
+		elif event['event'] == 'cancelled':
+			self.text_progress.set('Cancelled, finished rank pages were kept')
+		else:
+			self.text_progress.set('Failed')
+			messagebox.showerror('Error', f'Report generation failed:\n{event["error"]}')
+
+	def cancel_report(self):
+		self.cancel_event.set()
+		self.button_cancel.config(state=tk.DISABLED)
+		self.text_progress.set('Cancelling...')
+
+	def open_report(self):
+		if self.path_index is not None:
+			webbrowser.open(f'file://{os.path.abspath(self.path_index)}')
 
 	def quit(self):
+		self.cancel_event.set()
 		self.window.quit()
 		self.window.destroy()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     vkr = VoltaicKovaaksReport()
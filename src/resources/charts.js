@@ -0,0 +1,135 @@
+// draws the session charts of a rank page, every canvas.chart points (data-chart) into the
+// #chart_data json block (see vkr_modules/graphs.py chart_payload), same layout as the matplotlib graphs
+(function () {
+	var left = 60, right = 15, top = 10, bottom = 25;
+
+	function decode(payload) {
+		var dates = [], scores = [], date = 0, score = 0;
+
+		for (var i = 0; i < payload.date.length; i++) {
+			date += payload.date[i];
+			score += payload.score[i];
+			dates.push(date);
+			scores.push(score * payload.step);
+		}
+
+		return {dates: dates, scores: scores};
+	}
+
+	function rollingMean(values, window) {
+		var means = [], sum = 0;
+
+		for (var i = 0; i < values.length; i++) {
+			sum += values[i];
+			if (i >= window) {
+				sum -= values[i - window];
+			}
+			means.push(sum / Math.min(i + 1, window));
+		}
+
+		return means;
+	}
+
+	function smoothLine(ctx, xs, ys) {
+		// quadratic curves through the midpoints, a light stand-in for the spline of the png graphs
+		ctx.beginPath();
+		ctx.moveTo(xs[0], ys[0]);
+
+		for (var i = 1; i < xs.length - 1; i++) {
+			ctx.quadraticCurveTo(xs[i], ys[i], (xs[i] + xs[i + 1]) / 2, (ys[i] + ys[i + 1]) / 2);
+		}
+
+		ctx.lineTo(xs[xs.length - 1], ys[ys.length - 1]);
+		ctx.stroke();
+	}
+
+	function draw(canvas, payload) {
+		var data = decode(payload);
+		var averages = rollingMean(data.scores, payload.average);
+		var ctx = canvas.getContext('2d');
+		var width = canvas.width - left - right, height = canvas.height - top - bottom;
+
+		var xMin = data.dates[0], xMax = data.dates[data.dates.length - 1];
+		var yMin = Math.min.apply(null, data.scores), yMax = Math.max.apply(null, data.scores);
+		var xSpan = xMax - xMin || 1, ySpan = yMax - yMin || 1;
+
+		function px(x) { return left + (x - xMin) / xSpan * width; }
+		function py(y) { return top + height - (y - yMin) / ySpan * height; }
+
+		// x axis is labelled in days ago, against the local time the stat files are named with
+		var now = (Date.now() - new Date().getTimezoneOffset() * 60000) / 60000;
+
+		ctx.font = '11px sans-serif';
+		ctx.fillStyle = '#FFFFFF';
+		ctx.lineWidth = 1;
+
+		ctx.strokeStyle = '#FFFFFF';
+		ctx.beginPath();
+		ctx.moveTo(left, top + 0.5);
+		ctx.lineTo(left + width, top + 0.5);
+		ctx.moveTo(left, top + height + 0.5);
+		ctx.lineTo(left + width, top + height + 0.5);
+		ctx.stroke();
+
+		ctx.textAlign = 'right';
+		ctx.textBaseline = 'middle';
+		for (var i = 0; i <= 4; i++) {
+			var y = yMin + ySpan / 4 * i;
+			ctx.fillText(Math.round(y * 100) / 100, left - 6, py(y));
+
+			if (i > 0 && i < 4) {
+				ctx.strokeStyle = 'rgba(128, 128, 128, 0.2)';
+				ctx.beginPath();
+				ctx.moveTo(left, py(y));
+				ctx.lineTo(left + width, py(y));
+				ctx.stroke();
+			}
+		}
+
+		ctx.textAlign = 'center';
+		ctx.textBaseline = 'top';
+		var xTicks = [0, 0.5, 0.75, 0.875, 1];
+		for (var i = 0; i < xTicks.length; i++) {
+			var x = xMin + xSpan * xTicks[i];
+			ctx.fillText(Math.floor((x - now) / 1440), px(x), top + height + 6);
+
+			if (i > 0 && i < xTicks.length - 1) {
+				ctx.strokeStyle = 'rgba(128, 128, 128, 0.2)';
+				ctx.setLineDash([4, 4]);
+				ctx.beginPath();
+				ctx.moveTo(px(x), top);
+				ctx.lineTo(px(x), top + height);
+				ctx.stroke();
+				ctx.setLineDash([]);
+			}
+		}
+
+		var xs = data.dates.map(px), ys = data.scores.map(py);
+
+		if (xs.length >= 3) {
+			ctx.strokeStyle = payload.colors[2];
+			ctx.globalAlpha = 0.5;
+			ctx.setLineDash([6, 4]);
+			smoothLine(ctx, xs, averages.map(py));
+			ctx.setLineDash([]);
+			ctx.globalAlpha = 1;
+		}
+
+		ctx.strokeStyle = payload.colors[1];
+		ctx.lineWidth = xs.length >= 3 ? 1.75 : 1;
+		smoothLine(ctx, xs, ys);
+
+		ctx.fillStyle = payload.colors[0];
+		for (var i = 0; i < xs.length; i++) {
+			ctx.beginPath();
+			ctx.arc(xs[i], ys[i], 3.5, 0, 2 * Math.PI);
+			ctx.fill();
+		}
+	}
+
+	var payloads = JSON.parse(document.getElementById('chart_data').textContent);
+	var canvases = document.querySelectorAll('canvas.chart');
+	for (var i = 0; i < canvases.length; i++) {
+		draw(canvases[i], payloads[parseInt(canvases[i].getAttribute('data-chart'), 10)]);
+	}
+})();
@@ -10,10 +10,12 @@ build_exe_options = {
 											'os',
 											'datetime',
 											'json',
+											'sqlite3',
+											'concurrent',
+											'multiprocessing',
 											'tkinter',
 											'statistics',
 											'PIL',
-											'yattag',
 											'numpy',
 											'matplotlib',
 											'scipy',
@@ -26,6 +28,12 @@ executables = [Executable(
 							base=base,
 							icon='resources/vkr_icon.ico',
 							target_name='VoltaicKovaaKsReport'
+							),
+				Executable(
+							script='cli.py',
+							base=None,
+							icon='resources/vkr_icon.ico',
+							target_name='VoltaicKovaaKsReportCLI'
 							)
 ]
 
@@ -0,0 +1,184 @@
+import os
+import json
+import datetime
+
+import numpy as np
+
+from vkr_modules.runs import RunBatch
+from vkr_modules.stat_index import StatIndex
+from vkr_modules.ingest import Ingestor
+from vkr_modules.instrumentation import Instrumentation
+from vkr_modules.storage import scenario_filename, folder_key
+from vkr_modules.exceptions import ArchiveError
+
+
+class RunArchive:
+	# append-only columnar archive of parsed runs: one compressed npz chunk per scenario and
+	# compaction, plus index.json listing the chunks and the high-water mark, the date of the
+	# newest stat file folded in. Stat files up to that date are read from the archive, only
+	# newer ones are parsed from the stats folder. An archive belongs to the stats folder it was
+	# compacted from, another folder reported into the same output does not read it.
+	version = 1
+	index_name = 'index.json'
+	# partial chunks a scenario can pile up before it is repacked
+	max_chunks = 8
+
+	def __init__(self, path_archive, stats_folder, instrumentation=None):
+		self.path_archive = path_archive
+		self.path_index = os.path.join(self.path_archive, RunArchive.index_name)
+		self.stats_folder = folder_key(stats_folder)
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+		self.high_water = None
+		self.scenarios = dict()
+		# the stats folder of an archive compacted from another one, never merged into
+		self.other_folder = None
+
+		if os.path.isfile(self.path_index):
+			with open(self.path_index, 'r') as fp:
+				index = json.load(fp)
+
+			# archives written by another version are ignored and rebuilt by the next compaction, archives
+			# from before the stats folder was recorded are kept by the folder that reads them first
+			if index.get('stats_folder', self.stats_folder) != self.stats_folder:
+				self.other_folder = index['stats_folder']
+			elif index.get('version') == RunArchive.version:
+				self.high_water = datetime.datetime.fromisoformat(index['high_water']) if index['high_water'] is not None else None
+				self.scenarios = index['scenarios']
+
+	def __contains__(self, scenario_name):
+		return scenario_name in self.scenarios
+
+	def __len__(self):
+		return sum(chunk['count'] for chunks in self.scenarios.values() for chunk in chunks)
+
+	def chunk_files(self, scenario_name):
+		return [chunk['file'] for chunk in self.scenarios.get(scenario_name, [])]
+
+	def iter_chunks(self, scenario_name):
+		# archived runs of the scenario one chunk at a time, chunks are in date order
+		for chunk in self.scenarios.get(scenario_name, []):
+			with self.instrumentation.stage('archive'):
+				runs = RunBatch(self.read_chunk(chunk['file']))
+
+			self.instrumentation.count('runs_archived', len(runs))
+
+			yield runs
+
+	def compact(self, ingestor):
+		# folds every stat file newer than the high-water mark into the archive, returns the runs added
+		if self.other_folder is not None:
+			raise ArchiveError(f'{self.path_archive} holds the runs of {self.other_folder}, compact {self.stats_folder} into another output folder.')
+
+		stat_index = StatIndex(self.stats_folder, newer_than=self.high_water)
+		os.makedirs(self.path_archive, exist_ok=True)
+
+		# a file that fails to parse (e.g. still being written) stops the compaction at its date: the
+		# high-water mark stays below it, so it and every newer file are read from the stats folder again
+		cutoff = self.first_failed(stat_index, ingestor)
+		file_groups = {scenario_name: [sf for sf in stat_files if cutoff is None or sf.date < cutoff] for scenario_name, stat_files in stat_index.scenarios.items()}
+		file_groups = {scenario_name: stat_files for scenario_name, stat_files in file_groups.items() if len(stat_files) > 0}
+
+		added = 0
+		high_water = self.high_water
+		obsolete = []
+
+		for scenario_name, stat_files in zip(file_groups, ingestor.iter_batches(file_groups.values())):
+			# one chunk per batch, each batch's runs are released once it is written
+			for runs in ingestor.load_batches(stat_files):
+				runs = RunBatch.from_runs(runs)
+
+				if len(runs) > 0:
+					chunks = self.scenarios.setdefault(scenario_name, [])
+					chunks.append(self.write_chunk(scenario_name, runs.array))
+					added += len(runs)
+
+			last_date = stat_files[-1].date
+			high_water = last_date if high_water is None else max(high_water, last_date)
+
+			# every compaction leaves a partial chunk behind, once they pile up the scenario is repacked
+			chunks = self.scenarios.get(scenario_name, [])
+			if len(chunks) >= RunArchive.max_chunks + sum(chunk['count'] for chunk in chunks) // Ingestor.batch_size:
+				obsolete += [chunk['file'] for chunk in chunks]
+				self.scenarios[scenario_name] = self.repack(scenario_name, chunks)
+
+		self.high_water = high_water
+		self.write_index()
+
+		# merged chunks are only deleted once the new index no longer points at them
+		for filename in obsolete:
+			os.remove(os.path.join(self.path_archive, filename))
+
+		return added
+
+	def first_failed(self, stat_index, ingestor):
+		# date of the oldest file that does not parse, the parsed ones are in the parse cache for the compaction
+		stat_files = [sf for stat_files in stat_index.scenarios.values() for sf in stat_files]
+		cutoff = None
+
+		for i in range(0, len(stat_files), Ingestor.batch_size):
+			batch = stat_files[i:i + Ingestor.batch_size]
+			ingestor.ingest(batch)
+			ingestor.release(batch)
+
+			for sf in batch:
+				if sf.filename in ingestor.failed and (cutoff is None or sf.date < cutoff):
+					cutoff = sf.date
+
+		# flushed, so the compaction itself finds every parsed file in the cache
+		if ingestor.parse_cache is not None:
+			ingestor.parse_cache.save()
+
+		return cutoff
+
+	def repack(self, scenario_name, chunks):
+		# chunks of about batch_size runs, in the same order, reading one chunk at a time
+		packed = []
+		pending = []
+
+		for chunk in chunks:
+			pending.append(self.read_chunk(chunk['file']))
+
+			if sum(len(array) for array in pending) >= Ingestor.batch_size:
+				packed.append(self.write_chunk(scenario_name, np.concatenate(pending)))
+				pending = []
+
+		if len(pending) > 0:
+			packed.append(self.write_chunk(scenario_name, np.concatenate(pending)))
+
+		return packed
+
+	def write_chunk(self, scenario_name, array):
+		filename = scenario_filename(self.path_archive, scenario_name, '.npz')
+
+		columns = {field: array[field] for field in RunBatch.fields}
+		columns['date'] = array['date'].astype('i8')
+		np.savez_compressed(os.path.join(self.path_archive, filename), **columns)
+
+		return {'file': filename, 'count': len(array),
+				'first': str(array['date'].min()) if len(array) > 0 else None,
+				'last': str(array['date'].max()) if len(array) > 0 else None}
+
+	def read_chunk(self, filename):
+		with np.load(os.path.join(self.path_archive, filename)) as chunk:
+			array = np.empty(len(chunk['date']), dtype=RunBatch.dtype)
+			array['date'] = chunk['date'].astype('datetime64[us]')
+			for field in RunBatch.fields:
+				array[field] = chunk[field]
+
+		return array
+
+	def write_index(self):
+		index = {
+					'version': RunArchive.version,
+					'stats_folder': self.stats_folder,
+					'high_water': self.high_water.isoformat() if self.high_water is not None else None,
+					'scenarios': self.scenarios
+		}
+
+		# written aside and swapped in, a crash mid-compaction leaves the previous index intact
+		path_tmp = self.path_index + '.tmp'
+		with open(path_tmp, 'w') as fp:
+			json.dump(index, fp)
+
+		os.replace(path_tmp, self.path_index)
@@ -0,0 +1,37 @@
+import numpy as np
+
+# series reduction ahead of the graph splines: long histories are averaged down to about as many
+# points as the graph can show. 'auto' uses equal time buckets, at most max_points of them, and leaves
+# shorter histories untouched; 'day'/'week' average every calendar day/week. Averages keep the
+# quadratic spline smooth, picking actual sessions (e.g. LTTB) keeps the extremes the spline overshoots.
+# Every function returns the reduced x and the reduced columns of ys in the same order.
+
+reductions = ['auto', 'day', 'week']
+bucket_days = {'day': 1, 'week': 7}
+# x is in matplotlib date numbers (days since 1970-01-01), weeks start on Monday 1970-01-05
+bucket_origin = 4.0
+
+
+def bucket_means(x, ys, buckets):
+	# one point per bucket at its mean date
+	_, inverse, counts = np.unique(buckets, return_inverse=True, return_counts=True)
+
+	def means(values):
+		return np.bincount(inverse, weights=values) / counts
+
+	return means(x), [means(y) for y in ys]
+
+
+def reduce_series(x, ys, reduction, max_points):
+	# reduction: None (every point) or one of reductions
+	if reduction is None:
+		return x, ys
+
+	if reduction == 'auto':
+		if len(x) <= max_points or x[-1] <= x[0]:
+			return x, ys
+
+		width = (x[-1] - x[0]) / max_points
+		return bucket_means(x, ys, np.minimum(np.floor((x - x[0]) / width), max_points - 1).astype('i8'))
+
+	return bucket_means(x, ys, np.floor((x - bucket_origin) / bucket_days[reduction]).astype('i8'))
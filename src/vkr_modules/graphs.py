@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import datetime
+import hashlib
+import concurrent.futures
+
+import numpy as np
+
+from vkr_modules.rolling import rolling_mean
+from vkr_modules.downsample import reduce_series
+from vkr_modules.instrumentation import Instrumentation
+
+
+def render_graph(dates, scores, average_threshold, color_style, save_path, reduction=None, max_points=500, path_curve=None, curve_key=None):
+	# module level so it can be shipped to worker processes, uses the object oriented
+	# Figure/Agg API so nothing is kept alive by pyplot between graphs
+	# matplotlib (which pulls in PIL) and scipy are only imported once a graph is drawn
+	import matplotlib.dates
+
+	t0 = time.perf_counter()
+
+	# the reduced series and fitted curves are cached per scenario, an unchanged history skips both
+	curves = load_curves(path_curve, curve_key)
+
+	if curves is None:
+		curves = fit_curves(matplotlib.dates.date2num(dates), np.asarray(scores, dtype='f8'), average_threshold, reduction, max_points)
+		save_curves(path_curve, curve_key, curves)
+
+	dates_n = curves['dates']
+	scores = curves['scores']
+	dates_continuous = curves['dates_continuous']
+	scores_continuous = curves['scores_continuous']
+	averages_continuous = curves['averages_continuous']
+
+	t1 = time.perf_counter()
+
+	fig, ax = graph_figure(dates_n, scores)
+
+	# plotting
+	if len(dates_n) >= 3:
+		ax.plot(dates_continuous, averages_continuous, '--', color=color_style['average'], alpha=0.5)
+		ax.plot(dates_continuous, scores_continuous, '-', color=color_style['continuous'], linewidth=1.75)
+		ax.plot(dates_n, scores, 'o', markersize=5, color=color_style['dots'])
+	else:
+		ax.plot(dates_n, scores, '-', color=color_style['continuous'])
+		ax.plot(dates_n, scores, 'o', markersize=5, color=color_style['dots'])
+
+	fig.tight_layout()
+	fig.savefig(save_path, transparent=True)
+	fig.clear()
+
+	return {'graph_spline': t1 - t0, 'graph_drawing': time.perf_counter() - t1}
+
+
+def render_overlay(series, average_threshold, colors, save_path, reduction=None, max_points=500):
+	# team comparison graph, series: [(player name, session dates, session scores)], one color each.
+	# Every player's sessions are drawn as faint dots under the rolling average of the last k+1
+	import matplotlib.dates
+
+	t0 = time.perf_counter()
+
+	lines = []
+	for (name, dates, scores), color in zip(series, colors):
+		dates_n = matplotlib.dates.date2num(dates)
+		scores = np.asarray(scores, dtype='f8')
+		dates_n, (scores, averages) = reduce_series(dates_n, [scores, rolling_mean(scores, average_threshold + 1)], reduction, max_points)
+		lines.append((name, dates_n, scores, averages, color))
+
+	t1 = time.perf_counter()
+
+	fig, ax = graph_figure(np.concatenate([line[1] for line in lines]), np.concatenate([line[2] for line in lines]))
+
+	for name, dates_n, scores, averages, color in lines:
+		ax.plot(dates_n, scores, 'o', markersize=3, color=color, alpha=0.35)
+		ax.plot(dates_n, averages, '-', color=color, linewidth=1.75, label=name)
+
+	ax.legend(loc='upper left', fontsize=8, frameon=False, labelcolor='white', ncol=min(len(lines), 4))
+
+	fig.tight_layout()
+	fig.savefig(save_path, transparent=True)
+	fig.clear()
+
+	return {'graph_spline': t1 - t0, 'graph_drawing': time.perf_counter() - t1}
+
+
+def graph_figure(dates_n, scores):
+	# figure in the report style, score ticks over the range and date ticks labelled in days ago
+	import matplotlib.dates
+	from matplotlib.figure import Figure
+	from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+	# prepare figure
+	fig = Figure(figsize=(10, 2))
+	FigureCanvasAgg(fig)
+	ax = fig.subplots()
+
+	# set colors and graph style
+	fig.set_facecolor('#7F00FF')
+	ax.set_facecolor('#7F00FF')
+
+	ax.spines['bottom'].set_color('white')
+	ax.spines['top'].set_color('white')
+	ax.tick_params(colors='white')
+
+	ax.spines['left'].set_visible(False)
+	ax.spines['right'].set_visible(False)
+
+	# y/x ticks
+	yticks = [(scores.max()-scores.min())/4*i + scores.min() for i in range(0, 4+1)]
+	ax.set_yticks(yticks)
+
+	xtick0 = dates_n.min()
+	xtick1 = 0.5*(dates_n.max() - dates_n.min()) + xtick0
+	xtick2 = 0.5*(dates_n.max() - xtick1) + xtick1
+	xtick3 = 0.5*(dates_n.max() - xtick2) + xtick2
+	xtick4 = dates_n.max()
+	xticks = [xtick0, xtick1, xtick2, xtick3, xtick4]
+
+	xticklabels = [(d.replace(tzinfo=None)-datetime.datetime.now()).days for d in matplotlib.dates.num2date(xticks)]
+	ax.set_xticks(xticks)
+	ax.set_xticklabels(xticklabels, rotation=0, fontsize=8)
+
+	for y in yticks[1:4]:
+		ax.axhline(y=y, color='gray', linestyle='-', alpha=0.2, linewidth=1)
+
+	for x in xticks[1:4]:
+		ax.axvline(x=x, color='gray', linestyle='--', alpha=0.2, linewidth=1)
+
+	return fig, ax
+
+
+def fit_curves(dates_n, scores, average_threshold, reduction=None, max_points=500):
+	from scipy.interpolate import make_interp_spline
+
+	# average of each score and the last k before it, over the full history
+	scores_average = rolling_mean(scores, average_threshold + 1)
+
+	dates_n, (scores, scores_average) = reduce_series(dates_n, [scores, scores_average], reduction, max_points)
+
+	curves = {'dates': dates_n, 'scores': scores}
+
+	# spline interpolation
+	if len(dates_n) >= 3:
+		curves['dates_continuous'] = np.linspace(dates_n.min(), dates_n.max(), 500)
+		curves['scores_continuous'] = make_interp_spline(dates_n, scores, k=2)(curves['dates_continuous'])
+		curves['averages_continuous'] = make_interp_spline(dates_n, scores_average, k=2)(curves['dates_continuous'])
+	else:
+		curves['dates_continuous'] = curves['scores_continuous'] = curves['averages_continuous'] = np.empty(0)
+
+	return curves
+
+
+def load_curves(path_curve, curve_key):
+	if path_curve is None or not os.path.isfile(path_curve):
+		return None
+
+	try:
+		with np.load(path_curve) as cached:
+			if str(cached['key']) != curve_key:
+				return None
+
+			return {name: cached[name] for name in cached.files if name != 'key'}
+	except (OSError, ValueError, KeyError):
+		return None
+
+
+def save_curves(path_curve, curve_key, curves):
+	if path_curve is not None:
+		np.savez(path_curve, key=curve_key, **curves)
+
+
+def chart_payload(dates, scores, average_threshold, color_style):
+	# compact session arrays for the in-browser charts (resources/charts.js): dates as minutes,
+	# delta-encoded from the first session, scores quantized to ~1/1000 of their range and delta-encoded
+	minutes = np.asarray(dates, dtype='datetime64[m]').astype('i8')
+	scores = np.asarray(scores, dtype='f8')
+
+	score_range = scores.max() - scores.min() if len(scores) > 0 else 0.0
+	step = 10.0 ** np.floor(np.log10(score_range / 1000)) if score_range > 0 else 1.0
+	quantized = np.round(scores / step).astype('i8')
+
+	return {
+			'date': np.diff(minutes, prepend=0).tolist(),
+			'score': np.diff(quantized, prepend=0).tolist(),
+			'step': float(step),
+			'average': average_threshold + 1,
+			'colors': [color_style['dots'], color_style['continuous'], color_style['average']]
+	}
+
+
+class GraphRenderer:
+	manifest_name = 'graphs.json'
+	curves_folder = 'curves'
+
+	# series reduction before the spline fit, one of downsample.reductions or None for every session
+	reduction = 'auto'
+	max_points = 500
+
+	def __init__(self, path_imgs, workers=None, instrumentation=None, reduction=None, max_points=None):
+		self.path_imgs = path_imgs
+		self.workers = workers if workers is not None else (os.cpu_count() or 1)
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+		self.path_manifest = os.path.join(self.path_imgs, GraphRenderer.manifest_name)
+		self.path_curves = os.path.join(self.path_imgs, GraphRenderer.curves_folder)
+
+		if reduction is not None:
+			self.reduction = reduction if reduction != 'full' else None
+		if max_points is not None:
+			self.max_points = max_points
+
+		os.makedirs(self.path_curves, exist_ok=True)
+
+		self.executor = None
+		self.manifest = dict()
+
+		if os.path.isfile(self.path_manifest):
+			with open(self.path_manifest, 'r') as fp:
+				self.manifest = json.load(fp)
+
+	def render(self, jobs):
+		# jobs: [(scenario_name, sessions, average_threshold, color_style)], returns the rendered names
+		with self.instrumentation.stage('graphing'):
+			return self.render_jobs(jobs)
+
+	def render_jobs(self, jobs):
+		to_render = []
+
+		for scenario_name, sessions, average_threshold, color_style in jobs:
+			save_path = os.path.join(self.path_imgs, f'{scenario_name}.png')
+			digest = GraphRenderer.digest(sessions, average_threshold, color_style, self.reduction, self.max_points)
+
+			if self.manifest.get(scenario_name) == digest and os.path.isfile(save_path):
+				continue
+
+			path_curve = os.path.join(self.path_curves, f'{scenario_name}.npz')
+			curve_key = GraphRenderer.curve_key(sessions, average_threshold, self.reduction, self.max_points)
+
+			to_render.append((scenario_name, digest, (sessions['date'], sessions['score'], average_threshold, color_style, save_path,
+														self.reduction, self.max_points, path_curve, curve_key)))
+
+		return self.execute(render_graph, to_render, len(jobs))
+
+	def render_overlays(self, jobs):
+		# jobs: [(scenario_name, [(player name, sessions)], average_threshold, colors)], team comparison graphs
+		# saved as team_<scenario_name>.png, returns the rendered names
+		with self.instrumentation.stage('graphing'):
+			to_render = []
+
+			for scenario_name, players, average_threshold, colors in jobs:
+				name = f'team_{scenario_name}'
+				save_path = os.path.join(self.path_imgs, f'{name}.png')
+
+				h = hashlib.sha1()
+				for (player, sessions), color in zip(players, colors):
+					h.update(repr((player, color)).encode())
+					h.update(GraphRenderer.curve_key(sessions, average_threshold, self.reduction, self.max_points).encode())
+				h.update(datetime.date.today().isoformat().encode())
+				digest = h.hexdigest()
+
+				if self.manifest.get(name) == digest and os.path.isfile(save_path):
+					continue
+
+				series = [(player, sessions['date'], sessions['score']) for player, sessions in players]
+				to_render.append((name, digest, (series, average_threshold, colors, save_path, self.reduction, self.max_points)))
+
+			return self.execute(render_overlay, to_render, len(jobs))
+
+	def execute(self, function, to_render, n_jobs):
+		# to_render: [(manifest name, digest, function args)]
+		if self.workers <= 1 or len(to_render) < 2:
+			timings = [function(*args) for _, _, args in to_render]
+		else:
+			if self.executor is None:
+				self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+			futures = [self.executor.submit(function, *args) for _, _, args in to_render]
+			timings = [future.result() for future in futures]
+
+		for timing in timings:
+			for name, seconds in timing.items():
+				self.instrumentation.add_time(name, seconds)
+
+		self.instrumentation.count('graphs_rendered', len(to_render))
+		self.instrumentation.count('graphs_skipped', n_jobs - len(to_render))
+
+		for name, digest, _ in to_render:
+			self.manifest[name] = digest
+
+		return [name for name, _, _ in to_render]
+
+	def save(self):
+		with open(self.path_manifest, 'w') as fp:
+			json.dump(self.manifest, fp)
+
+	def close(self):
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
+
+		self.save()
+
+	@staticmethod
+	def digest(sessions, average_threshold, color_style, reduction=None, max_points=None):
+		# the x axis is labelled in days ago, so a graph also goes stale when the day changes
+		h = hashlib.sha1()
+		h.update(GraphRenderer.curve_key(sessions, average_threshold, reduction, max_points).encode())
+		h.update(repr((sorted(color_style.items()), datetime.date.today().isoformat())).encode())
+
+		return h.hexdigest()
+
+	@staticmethod
+	def curve_key(sessions, average_threshold, reduction=None, max_points=None):
+		# the fitted curves only depend on the sessions and the reduction, not on the day
+		h = hashlib.sha1()
+		h.update(sessions['date'].tobytes())
+		h.update(sessions['score'].tobytes())
+		h.update(repr((average_threshold, reduction, max_points)).encode())
+
+		return h.hexdigest()
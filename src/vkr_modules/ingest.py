@@ -0,0 +1,157 @@
+import os
+import concurrent.futures
+
+from vkr_modules.stat_parser import try_parse_stat_file
+from vkr_modules.instrumentation import Instrumentation
+
+
+class Ingestor:
+	# below this many files a thread pool is cheaper than spawning processes
+	process_threshold = 256
+	# runs held in memory at once, bigger scenarios are streamed in batches of this many files
+	batch_size = 2048
+
+	def __init__(self, stats_folder, parse_cache=None, workers=None, instrumentation=None):
+		self.stats_folder = stats_folder
+		self.parse_cache = parse_cache
+		self.workers = workers if workers is not None else (os.cpu_count() or 1)
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+		# runs of the files ingested and not yet released, None for the ones that failed: a file is read
+		# once per pass (prefetch and load), failed files are only tried again after their release
+		self.runs = dict()
+		# files that could not be parsed
+		self.failed = set()
+		# pools are kept for the whole run and shared by every batch, keyed by processes/threads
+		self.executors = dict()
+
+	def ingest(self, stat_files):
+		with self.instrumentation.stage('parsing'):
+			self.ingest_files(stat_files)
+
+	def ingest_files(self, stat_files):
+		pending = [sf for sf in stat_files if sf.filename not in self.runs]
+
+		# resolve everything the cache knows about first, only the rest is parsed
+		to_parse = []
+		stat_results = dict()
+		missing = 0
+
+		if self.parse_cache is None:
+			to_parse = pending
+		else:
+			cached = self.parse_cache.get_files([sf.filename for sf in pending])
+
+			for sf in pending:
+				# a listed file may be gone by now, it fails like an unreadable one
+				try:
+					stat_result = os.stat(os.path.join(self.stats_folder, sf.filename))
+				except OSError:
+					self.instrumentation.count('files_failed')
+					self.runs[sf.filename] = None
+					self.failed.add(sf.filename)
+					missing += 1
+					continue
+
+				entry = cached.get(sf.filename)
+
+				if entry is not None and self.parse_cache.is_fresh(entry, stat_result):
+					self.runs[sf.filename] = self.make_run(sf, entry[2])
+					self.failed.discard(sf.filename)
+				else:
+					to_parse.append(sf)
+					stat_results[sf.filename] = stat_result
+
+		paths = [os.path.join(self.stats_folder, sf.filename) for sf in to_parse]
+
+		self.instrumentation.count('files_cached', len(pending) - len(to_parse) - missing)
+		self.instrumentation.count('files_parsed', len(to_parse))
+		self.instrumentation.count('bytes_parsed', sum(stat_result.st_size for stat_result in stat_results.values()))
+
+		for sf, parsed in zip(to_parse, self.parse_all(paths)):
+			# unreadable or truncated files are left out of the run
+			if parsed is None:
+				self.instrumentation.count('files_failed')
+				self.runs[sf.filename] = None
+				self.failed.add(sf.filename)
+				continue
+
+			self.runs[sf.filename] = self.make_run(sf, parsed)
+			self.failed.discard(sf.filename)
+
+			if self.parse_cache is not None:
+				self.parse_cache.put(sf, stat_results[sf.filename], parsed)
+
+	def load(self, stat_files):
+		self.ingest(stat_files)
+
+		return [self.runs[sf.filename] for sf in stat_files if self.runs.get(sf.filename) is not None]
+
+	def load_batches(self, stat_files):
+		# runs of stat_files, batch_size files at a time, each batch is released once the next one is requested
+		for i in range(0, len(stat_files), Ingestor.batch_size):
+			batch = stat_files[i:i + Ingestor.batch_size]
+
+			try:
+				yield self.load(batch)
+			finally:
+				self.release(batch)
+
+	def iter_batches(self, file_groups):
+		# yields every group of stat files (one per scenario) once it is ingested, consecutive groups are
+		# parsed together up to batch_size files, bigger groups are left to load_batches
+		pending = []
+		n_files = 0
+
+		for stat_files in file_groups:
+			if n_files + len(stat_files) > Ingestor.batch_size and len(pending) > 0:
+				yield from self.ingest_groups(pending)
+				pending = []
+				n_files = 0
+
+			pending.append(stat_files)
+			n_files += len(stat_files)
+
+		yield from self.ingest_groups(pending)
+
+	def ingest_groups(self, file_groups):
+		stat_files = [sf for group in file_groups for sf in group]
+		if len(stat_files) <= Ingestor.batch_size:
+			self.ingest(stat_files)
+
+		yield from file_groups
+
+	def release(self, stat_files):
+		for sf in stat_files:
+			self.runs.pop(sf.filename, None)
+
+	def parse_all(self, paths):
+		if self.workers <= 1 or len(paths) < 2:
+			return [try_parse_stat_file(path) for path in paths]
+
+		processes = len(paths) >= Ingestor.process_threshold
+		chunksize = max(1, len(paths) // (4*self.workers)) if processes else 1
+
+		return list(self.get_executor(processes).map(try_parse_stat_file, paths, chunksize=chunksize))
+
+	def get_executor(self, processes):
+		if processes not in self.executors:
+			if processes:
+				self.executors[processes] = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+			else:
+				self.executors[processes] = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+
+		return self.executors[processes]
+
+	def close(self):
+		for executor in self.executors.values():
+			executor.shutdown()
+
+		self.executors = dict()
+
+	@staticmethod
+	def make_run(stat_file, parsed):
+		run = {'date': stat_file.date}
+		run.update(parsed)
+
+		return run
@@ -0,0 +1,131 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import datetime
+import contextlib
+import tracemalloc
+
+
+class Instrumentation:
+	# stage timers and counters for one report run, cProfile/tracemalloc capture is optional:
+	# Instrumentation(profile=True, trace_memory=True) or VKR_PROFILE=1 / VKR_TRACEMALLOC=1
+	env_profile = 'VKR_PROFILE'
+	env_trace_memory = 'VKR_TRACEMALLOC'
+
+	def __init__(self, enabled=True, profile=None, trace_memory=None):
+		self.enabled = enabled
+		self.profile = profile if profile is not None else os.environ.get(Instrumentation.env_profile, '') not in ('', '0')
+		self.trace_memory = trace_memory if trace_memory is not None else os.environ.get(Instrumentation.env_trace_memory, '') not in ('', '0')
+
+		self.stages = dict()
+		self.counters = dict()
+		self.details = dict()
+		self.stack = []
+
+		self.profiler = None
+		self.memory_peak = None
+		self.memory_top = []
+		self.started = None
+		self.elapsed = None
+
+	def start(self):
+		self.started = time.perf_counter()
+
+		if self.enabled and self.profile:
+			self.profiler = cProfile.Profile()
+			self.profiler.enable()
+
+		if self.enabled and self.trace_memory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+
+	def stop(self):
+		self.elapsed = time.perf_counter() - self.started
+
+		if self.profiler is not None:
+			self.profiler.disable()
+
+		if self.enabled and self.trace_memory and tracemalloc.is_tracing():
+			self.memory_peak = tracemalloc.get_traced_memory()[1]
+			snapshot = tracemalloc.take_snapshot()
+			self.memory_top = [str(stat) for stat in snapshot.statistics('lineno')[:10]]
+			tracemalloc.stop()
+
+	@contextlib.contextmanager
+	def stage(self, name):
+		# nested stages are subtracted from their parent's own time
+		if not self.enabled:
+			yield
+			return
+
+		self.stack.append(0.0)
+		t0 = time.perf_counter()
+
+		try:
+			yield
+		finally:
+			elapsed = time.perf_counter() - t0
+			children = self.stack.pop()
+
+			if len(self.stack) > 0:
+				self.stack[-1] += elapsed
+
+			stage = self.stages.setdefault(name, {'calls': 0, 'total': 0.0, 'self': 0.0})
+			stage['calls'] += 1
+			stage['total'] += elapsed
+			stage['self'] += elapsed - children
+
+	def add_time(self, name, seconds):
+		# time measured inside a stage (possibly in worker processes), reported apart from the stages
+		if self.enabled:
+			self.details[name] = self.details.get(name, 0.0) + seconds
+
+	def count(self, name, n=1):
+		if self.enabled:
+			self.counters[name] = self.counters.get(name, 0) + n
+
+	def report(self):
+		report = {
+					'date': datetime.datetime.now().isoformat(timespec='seconds'),
+					'elapsed': self.elapsed,
+					'stages': self.stages,
+					'details': self.details,
+					'counters': self.counters
+		}
+
+		if self.memory_peak is not None:
+			report['memory_peak'] = self.memory_peak
+			report['memory_top'] = self.memory_top
+
+		return report
+
+	def summary(self):
+		# [(label, value)] rows for the report page, slowest stages first
+		rows = []
+		if self.started is not None:
+			elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+			rows.append(('total', f'{elapsed:.2f} s'))
+
+		rows += [(name, f'{stage["self"]:.2f} s') for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['self'])]
+		rows += [(name, f'{seconds:.2f} s') for name, seconds in self.details.items()]
+		rows += [(name, str(n)) for name, n in self.counters.items()]
+
+		if self.memory_peak is not None:
+			rows.append(('memory peak', f'{self.memory_peak/2**20:.1f} MiB'))
+
+		return rows
+
+	def write(self, path_report):
+		with open(path_report, 'w') as fp:
+			json.dump(self.report(), fp, indent=4)
+
+		if self.profiler is not None:
+			path_profile = os.path.splitext(path_report)[0] + '.prof'
+			self.profiler.dump_stats(path_profile)
+
+			stream = io.StringIO()
+			pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(40)
+			with open(os.path.splitext(path_report)[0] + '_profile.txt', 'w') as fp:
+				fp.write(stream.getvalue())
@@ -0,0 +1,70 @@
+import sqlite3
+
+
+class ParseCache:
+	# bump whenever the parsed fields change, older caches are discarded
+	version = 1
+
+	fields = ['shots', 'hits', 'accuracy', 'dmg_done', 'dmg_possible', 'kills', 'avg_ttk', 'score']
+
+	query_size = 500
+	# parsed rows are written out every this many, not kept until the end of the run
+	flush_size = 4096
+
+	def __init__(self, cache_path):
+		self.cache_path = cache_path
+		self.pending = []
+
+		self.connection = sqlite3.connect(self.cache_path)
+
+		if self.connection.execute('PRAGMA user_version').fetchone()[0] != ParseCache.version:
+			self.connection.execute('DROP TABLE IF EXISTS runs')
+			self.connection.execute(f'PRAGMA user_version = {ParseCache.version}')
+
+		columns = ', '.join(f'{field} REAL' for field in ParseCache.fields)
+		self.connection.execute(f'CREATE TABLE IF NOT EXISTS runs (filename TEXT PRIMARY KEY, scenario TEXT, mtime INTEGER, size INTEGER, {columns})')
+		self.connection.execute('CREATE INDEX IF NOT EXISTS runs_scenario ON runs (scenario)')
+		self.connection.commit()
+
+	def get_files(self, filenames):
+		# {filename: (mtime, size, run data without date)} for the cached ones among filenames,
+		# looked up in groups that stay under sqlite's bound parameter limit
+		columns = ', '.join(ParseCache.fields)
+		entries = dict()
+
+		for i in range(0, len(filenames), ParseCache.query_size):
+			group = filenames[i:i + ParseCache.query_size]
+			placeholders = ', '.join('?' for _ in group)
+			rows = self.connection.execute(f'SELECT filename, mtime, size, {columns} FROM runs WHERE filename IN ({placeholders})', group)
+
+			for row in rows:
+				run = dict(zip(ParseCache.fields, row[3:]))
+				run['shots'] = int(run['shots'])
+				run['hits'] = int(run['hits'])
+				run['kills'] = int(run['kills'])
+				entries[row[0]] = (row[1], row[2], run)
+
+		return entries
+
+	def put(self, stat_file, stat_result, scenario_data):
+		row = [stat_file.filename, stat_file.scenario_name, stat_result.st_mtime_ns, stat_result.st_size]
+		row += [scenario_data[field] for field in ParseCache.fields]
+		self.pending.append(row)
+
+		if len(self.pending) >= ParseCache.flush_size:
+			self.save()
+
+	def save(self):
+		if len(self.pending) > 0:
+			placeholders = ', '.join('?' for _ in range(4 + len(ParseCache.fields)))
+			self.connection.executemany(f'INSERT OR REPLACE INTO runs VALUES ({placeholders})', self.pending)
+			self.connection.commit()
+			self.pending = []
+
+	def close(self):
+		self.save()
+		self.connection.close()
+
+	@staticmethod
+	def is_fresh(entry, stat_result):
+		return entry[0] == stat_result.st_mtime_ns and entry[1] == stat_result.st_size
@@ -1,12 +1,22 @@
 import os
 import datetime
 import json
-import decimal
-
-import yattag
+import shutil
 
 from vkr_modules.scenario import Scenario
-from vkr_modules.exceptions import NoStatFoundException
+from vkr_modules.stat_index import StatIndex
+from vkr_modules.parse_cache import ParseCache
+from vkr_modules.ingest import Ingestor
+from vkr_modules.scenario_registry import ScenarioRegistry
+from vkr_modules.archive import RunArchive
+from vkr_modules.summary_index import SummaryIndex
+from vkr_modules.graphs import GraphRenderer, chart_payload
+from vkr_modules.watcher import StatWatcher
+from vkr_modules.playlist_registry import PlaylistRegistry
+from vkr_modules.scoring import ScoringEngine
+from vkr_modules import templates
+from vkr_modules.instrumentation import Instrumentation
+from vkr_modules.exceptions import GenerationCancelled
 
 class Playlist:
 	tracking = 'tracking'
@@ -19,311 +29,405 @@ class Playlist:
 					switching: Scenario.style_switching
 					}
 
-	# folders
-	path_files = None
-	path_imgs = None
-	path_pages = None
-	path_resources = None
-
-	# files
-	path_css = None
-
-	path_index = None
-	path_iron = None
-	path_bronze = None
-	path_silver = None
-	path_gold = None
-	path_platinum = None
-	path_diamond = None
-	path_jade = None
-	path_master = None
-	path_grandmaster = None
-
-	path_playlists_json = None
-
-	# playlists
-	playlist_json = None
-
-	# ranks
-	rank_iron = 'iron'
-	rank_bronze = 'bronze'
-	rank_silver = 'silver'
-	rank_gold = 'gold'
-	rank_platinum = 'platinum'
-	rank_diamond = 'diamond'
-	rank_jade = 'jade'
-	rank_master = 'master'
-	rank_grandmaster = 'grandmaster'
-
-	def __init__(self, stats_folder, root_folder):
+	# runs closer than this to the first run of a session are averaged into it
+	session_thresholds = {
+							tracking: Scenario.session_threshold,
+							clicking: Scenario.session_threshold,
+							switching: Scenario.session_threshold
+							}
+
+	# graph backends: matplotlib pngs, or session arrays drawn in the browser by resources/charts.js
+	charts_png = 'png'
+	charts_js = 'js'
+
+	def __init__(self, stats_folder, root_folder, workers=None, instrumentation=None, resources_folder=None, progress=None, cancel_event=None, graphs=True, charts=None, playlists=None, graph_resolution=None):
 		self.stats_folder = stats_folder
 		self.root_folder = root_folder
-
-		if Playlist.path_files is None:
-			Playlist.path_files = os.path.join(self.root_folder, 'report_files')
-			Playlist.path_imgs = os.path.join(Playlist.path_files, 'imgs')
-			Playlist.path_pages = os.path.join(Playlist.path_files, 'pages')
-			Playlist.path_resources = os.path.join(self.root_folder, 'resources')
-
-			Playlist.path_index = os.path.join(self.root_folder, 'report.html')
-			Playlist.path_iron = os.path.join(Playlist.path_pages, 'report_iron.html')
-			Playlist.path_bronze = os.path.join(Playlist.path_pages, 'report_bronze.html')
-			Playlist.path_silver = os.path.join(Playlist.path_pages, 'report_silver.html')
-			Playlist.path_gold = os.path.join(Playlist.path_pages, 'report_gold.html')
-			Playlist.path_platinum = os.path.join(Playlist.path_pages, 'report_platinum.html')
-			Playlist.path_diamond = os.path.join(Playlist.path_pages, 'report_diamond.html')
-			Playlist.path_jade = os.path.join(Playlist.path_pages, 'report_jade.html')
-			Playlist.path_master = os.path.join(Playlist.path_pages, 'report_master.html')
-			Playlist.path_grandmaster = os.path.join(Playlist.path_pages, 'report_grandmaster.html')
-
-			Playlist.path_css = os.path.join(Playlist.path_resources, 'voltaic_style.css')
-			Playlist.path_playlists_json = os.path.join(Playlist.path_resources, "playlists.json")
+		self.workers = workers
+		# graphs=False writes data-only pages, matplotlib and scipy are never imported
+		self.graphs = graphs
+		self.charts = charts if charts is not None else Playlist.charts_png
+		# series reduction ahead of the png splines, see GraphRenderer.reductions ('full' keeps every session)
+		self.graph_resolution = graph_resolution
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+		# progress(event) is called with {'event', 'name', 'path', 'done', 'total'} after every
+		# scenario and rank page, setting cancel_event stops the run at the next one
+		self.progress = progress
+		self.cancel_event = cancel_event
+		self.progress_done = 0
+		self.progress_total = 0
+		self.stat_index = None
+		self.parse_cache = None
+		self.ingestor = None
+		self.registry = None
+		self.graph_renderer = None
+		self.archive = None
+		self.summaries = None
+
+		# paths are per instance, several reports (one per stats folder) can be generated in one process
+		self.path_files = os.path.join(self.root_folder, 'report_files')
+		self.path_imgs = os.path.join(self.path_files, 'imgs')
+		self.path_pages = os.path.join(self.path_files, 'pages')
+		self.path_resources = resources_folder if resources_folder is not None else os.path.join(self.root_folder, 'resources')
+
+		self.path_index = os.path.join(self.root_folder, 'report.html')
+
+		self.path_css = os.path.join(self.path_resources, 'voltaic_style.css')
+		self.path_charts_js = os.path.join(self.path_resources, 'charts.js')
+		self.path_style = os.path.join(self.path_files, 'voltaic_style.css')
+		self.path_charts_script = os.path.join(self.path_files, 'charts.js')
+		# benchmark playlists, every rank of every playlist gets its own page
+		self.path_playlists = playlists if playlists is not None else [os.path.join(self.path_resources, 'playlists.json')]
+		self.path_parse_cache = os.path.join(self.path_files, 'parse_cache.sqlite3')
+		self.path_archive = os.path.join(self.path_files, 'archive')
+		self.path_summaries = os.path.join(self.path_files, 'summaries')
+		self.path_timings = os.path.join(self.path_files, 'timings.json')
+
+		self.playlists = None
+		self.headers = dict()
+		self.scoring = ScoringEngine()
 
 	def generate_scenarios(self, scenarios_template):
 		scenarios = {Playlist.tracking: dict(), Playlist.clicking: dict(), Playlist.switching: dict()}
 
 		for scenario_type in scenarios_template:
 			for scenario_name in scenarios_template[scenario_type]:
-				scenario = Scenario(scenario_name, self.stats_folder)
+				scenario = self.registry.get_scenario(scenario_name, Playlist.session_thresholds[scenario_type])
 				scenarios[scenario_type][scenario_name] = scenario
 
 		return scenarios
 
 	def generate_scenario_data(self, scenarios):
 		scenarios_data = {Playlist.tracking: dict(), Playlist.clicking: dict(), Playlist.switching: dict()}
-		
+
+		# scenarios already processed for a previous rank are reused as-is
+		self.registry.process([scenario_name for scenario_type in scenarios for scenario_name in scenarios[scenario_type]], self.scenario_processed)
+
 		for scenario_type in scenarios:
 			for scenario_name in scenarios[scenario_type]:
-				scenario = scenarios[scenario_type][scenario_name]
-
-				try:
-					scenario_data = scenario.process()
-					scenarios_data[scenario_type][scenario_name] = scenario_data
-				except NoStatFoundException:
-					scenarios_data[scenario_type][scenario_name] = None
+				scenarios_data[scenario_type][scenario_name] = self.registry.get_data(scenario_name)
 
 		return scenarios_data
 
 	def generate_graphs(self, scenarios, scenario_data):
+		jobs = []
+
 		for scenario_type in scenario_data:
 			for scenario_name in scenario_data[scenario_type]:
 				sc_data = scenario_data[scenario_type][scenario_name]
 
-				if sc_data is not None:
-					scenario = scenarios[scenario_type][scenario_name]
-					graph_path = os.path.join(Playlist.path_imgs, f'{scenario_name}.png')
-					scenario.generate_graph(sc_data['all'], 20, Playlist.color_style[scenario_type], graph_path)
+				if sc_data is not None and scenario_name not in self.registry.graphed:
+					jobs.append((scenario_name, sc_data['all'], 20, Playlist.color_style[scenario_type]))
+					self.registry.graphed.add(scenario_name)
+
+		# unchanged graphs from a previous run are skipped by the renderer
+		self.graph_renderer.render(jobs)
 
 	def generate_reports(self):
-		reports_to_make = [
-							'index', 
-							Playlist.rank_iron, 
-							Playlist.rank_bronze, 
-							Playlist.rank_silver, 
-							Playlist.rank_gold, 
-							Playlist.rank_platinum, 
-							Playlist.rank_diamond, 
-							Playlist.rank_jade, 
-							Playlist.rank_master, 
-							Playlist.rank_grandmaster
-							]
-
-		for report in reports_to_make:
-			doc, tag, text = yattag.Doc().tagtext()
-
-			doc.asis('<!DOCTYPE html>')
-
-			with tag('html'):
-				with tag('head'):
-					# doc.stag('link', rel='stylesheet', href=Playlist.path_css)
-					doc.stag('link', rel='stylesheet', href='https://fonts.googleapis.com/css?family=PT+Sans')
-
-					with tag('title'):
-						text('Voltaic Fundamentals Report')
-
-					with tag('style'):
-						with open(Playlist.path_css, 'r') as fp:
-							text(fp.read())
-
-				with tag('body'):
-					with tag('div', klass='header'):
-						with tag('h1'):
-							text('Voltaic Fundamentals Report')
-						with tag('p'):
-							date_str = datetime.datetime.now().strftime('%Y-%M-%d')
-							text(f'Made for Fundamental KvKs Routines 2.0 | Last update: {date_str}')
-
-					with tag('div', klass='navbar'):
-						with tag('a', klass=Playlist.rank_iron, href=Playlist.path_iron):
-							text('Iron')
-						with tag('a', klass=Playlist.rank_bronze, href=Playlist.path_bronze):
-							text('Bronze')
-						with tag('a', klass=Playlist.rank_silver, href=Playlist.path_silver):
-							text('Silver')
-						with tag('a', klass=Playlist.rank_gold, href=Playlist.path_gold):
-							text('Gold')
-						with tag('a', klass=Playlist.rank_platinum, href=Playlist.path_platinum):
-							text('Platinum')
-						with tag('a', klass=Playlist.rank_diamond, href=Playlist.path_diamond):
-							text('Diamond')
-						with tag('a', klass=Playlist.rank_jade, href=Playlist.path_jade):
-							text('Jade')
-						with tag('a', klass=Playlist.rank_master, href=Playlist.path_master):
-							text('Master')
-						with tag('a', klass=Playlist.rank_grandmaster, href=Playlist.path_grandmaster):
-							text('Grandmaster')
-
-					with tag('div', klass='main'):
-						doc.stag('hr', klass='horizontal_separator')
-
-					if report == 'index':
-						with tag('div', klass='index_report'):
-							with tag('h2'):
-								text('How to read the report')
-							text('Each dot represents the average of a training session (taking into account the closest 2 hours since the start of the training), the continuous line its just a visual feedback to connect these dots.')
-							doc.stag('br')
-							text('The dashed line represents the average of the last 20 training sessions for each scenario.')
-							doc.stag('br')
-							text('The numbers on the X axis represents how many days ago that session was played.')
-							doc.stag('br')
-							doc.stag('br')
-							text('Click on a rank button to get started.')
-
-				if report == 'index':
-					with open(Playlist.path_index, 'w') as fp:
-						fp.write(doc.getvalue())
-
-					continue
-
-				scenarios_template = self.get_rank_template(report)
-				scenarios = self.generate_scenarios(scenarios_template)
-				scenarios_data = self.generate_scenario_data(scenarios)
-				self.generate_graphs(scenarios, scenarios_data)
-
-				for sc_type in [Playlist.tracking, Playlist.clicking, Playlist.switching]:
-					with tag('div', klass=f'scenario_type {sc_type}'):
-						with tag('h2'):
-							text(sc_type.capitalize())
-
-						for sc_name in scenarios_data[sc_type]:
-							sc_data = scenarios_data[sc_type][sc_name]
-
-							with tag('div', klass='scenario'):
-								with tag('div', klass='name'):
-									with tag('h3'):
-										text(sc_name)
-
-								with tag('div', klass='contents'):
-									if sc_data is None:
-										text('Data not found.')
-									else:
-										with tag('div', klass='graph'):
-											# doc.stag('img', src=os.path.join(imgs, f'{sc_name}.png'))
-											doc.stag('img', src=f'../imgs/{sc_name}.png')
-
-										doc.stag('hr', klass='vertical_separator')
-
-										with tag('div', klass='data'):
-											with tag('div', klass='alltime'):
-												with tag('h4'):
-													text('All-time')
-
-												with tag('table', klass='data_table'):
-													with tag('tr'):
-														with tag('th'):
-															text('Max')
-														with tag('td'):
-															n = round(max([run['score'] for run in sc_data['all']]), 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('Min')
-														with tag('td'):
-															n = round(min([run['score'] for run in sc_data['all']]), 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('Average')
-														with tag('td'):
-															n = round(sc_data['total_trends']['average']['score'], 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('StDev')
-														with tag('td'):
-															n = round(sc_data['total_trends']['stdev']['score'], 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-
-											with tag('div', klass='last20'):
-												with tag('h4'):
-													text('Last 20')
-
-												with tag('table', klass='data_table'):
-													with tag('tr'):
-														with tag('th'):
-															text('Max')
-														with tag('td'):
-															n = round(max([run['score'] for run in sc_data['last20']]), 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('Min')
-														with tag('td'):
-															n = round(min([run['score'] for run in sc_data['last20']]), 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('Average')
-														with tag('td'):
-															n = round(sc_data['last20_trends']['average']['score'], 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-													with tag('tr'):
-														with tag('th'):
-															text('StDev')
-														with tag('td'):
-															n = round(sc_data['last20_trends']['stdev']['score'], 2)
-															n = int(n) if (10*n)%10==0 else n
-															text(n)
-
-					doc.stag('hr', klass='horizontal_separator')
-
-			if report == Playlist.rank_iron:
-				save_path = Playlist.path_iron
-			elif report == Playlist.rank_bronze:
-				save_path = Playlist.path_bronze
-			elif report == Playlist.rank_silver:
-				save_path = Playlist.path_silver
-			elif report == Playlist.rank_gold:
-				save_path = Playlist.path_gold
-			elif report == Playlist.rank_platinum:
-				save_path = Playlist.path_platinum
-			elif report == Playlist.rank_diamond:
-				save_path = Playlist.path_diamond
-			elif report == Playlist.rank_jade:
-				save_path = Playlist.path_jade
-			elif report == Playlist.rank_master:
-				save_path = Playlist.path_master
-			elif report == Playlist.rank_grandmaster:
-				save_path = Playlist.path_grandmaster
-
-			with open(save_path, 'w') as fp:
-				fp.write(doc.getvalue())
+		self.open_pipeline()
+
+		try:
+			self.write_reports()
+		finally:
+			self.close_pipeline()
+
+	def watch(self, on_update=None):
+		# writes the whole report once, then keeps the pipeline open and rewrites only the rank pages
+		# touched by new stat files until cancel_event is set, on_update(ranks) is called after each update
+		def update(filenames):
+			ranks = self.update_reports(filenames)
+
+			if on_update is not None:
+				on_update(ranks)
+
+			self.report_watching()
+
+		# the folder is snapshotted before the listing, files written meanwhile are not missed
+		watcher = StatWatcher(self.stats_folder, update, stop_event=self.cancel_event)
+		self.open_pipeline()
+
+		try:
+			self.write_reports()
+			self.save_pipeline()
+			self.report_watching()
+
+			watcher.run()
+		finally:
+			self.close_pipeline()
+
+	def update_reports(self, filenames):
+		# new stat files only invalidate their own scenarios, every other one stays processed and graphed
+		scenario_names = self.stat_index.add(filenames)
+		self.registry.invalidate(scenario_names)
+
+		playlists = self.get_playlists()
+		pages = playlists.get_pages_for(scenario_names)
+		self.progress_done = 0
+		self.progress_total = len(set(playlists.get_page_scenarios(pages)).intersection(scenario_names)) + len(pages)
+
+		for page in pages:
+			with self.instrumentation.stage('html'):
+				save_path = self.write_report(*page)
+
+			self.report_progress('rank', playlists.page_label(*page), save_path)
+
+		with self.instrumentation.stage('html'):
+			self.write_index()
+
+		self.save_pipeline()
+
+		return pages
+
+	def open_pipeline(self):
+		self.instrumentation.start()
+
+		# once compacted, history comes from the archive and only newer stat files are listed and parsed
+		self.archive = RunArchive(self.path_archive, self.stats_folder, self.instrumentation)
+
+		with self.instrumentation.stage('listing'):
+			self.stat_index = StatIndex(self.stats_folder, newer_than=self.archive.high_water)
+
+		# scenario summaries from the previous run, only the stat files played since are read
+		self.summaries = SummaryIndex(self.path_summaries, self.stats_folder, self.instrumentation)
+		self.parse_cache = ParseCache(self.path_parse_cache)
+		self.ingestor = Ingestor(self.stats_folder, self.parse_cache, self.workers, self.instrumentation)
+		self.registry = ScenarioRegistry(self.stat_index, self.ingestor, self.instrumentation, self.archive, self.summaries)
+		if self.graphs and self.charts == Playlist.charts_png:
+			self.graph_renderer = GraphRenderer(self.path_imgs, self.workers, self.instrumentation, self.graph_resolution)
+
+		self.copy_assets()
+
+	def save_pipeline(self):
+		self.parse_cache.save()
+		if self.summaries is not None:
+			self.summaries.save()
+		if self.graph_renderer is not None:
+			self.graph_renderer.save()
+		self.instrumentation.write(self.path_timings)
+
+	def close_pipeline(self):
+		self.ingestor.close()
+		self.parse_cache.close()
+		if self.summaries is not None:
+			self.summaries.save()
+		if self.graph_renderer is not None:
+			self.graph_renderer.close()
+		self.instrumentation.stop()
+		self.instrumentation.write(self.path_timings)
+		self.parse_cache = None
+		self.ingestor = None
+		self.registry = None
+		self.graph_renderer = None
+		self.archive = None
+		self.summaries = None
+
+	def compact(self):
+		# folds every stat file newer than the archive into it, returns the number of runs added
+		archive = RunArchive(self.path_archive, self.stats_folder, self.instrumentation)
+		parse_cache = ParseCache(self.path_parse_cache)
+		ingestor = Ingestor(self.stats_folder, parse_cache, self.workers, self.instrumentation)
+
+		try:
+			with self.instrumentation.stage('compaction'):
+				return archive.compact(ingestor)
+		finally:
+			ingestor.close()
+			parse_cache.close()
+
+	def write_reports(self):
+		# every rank of every playlist, scenarios shared between pages (or playlists) are processed once
+		playlists = self.get_playlists()
+		pages = playlists.get_pages()
+
+		self.progress_done = 0
+		self.progress_total = len(playlists.get_scenario_names()) + len(pages)
+
+		# the index is written first so the report can be opened while the ranks are generated,
+		# each rank page is written as soon as it is ready
+		with self.instrumentation.stage('html'):
+			self.write_index()
+
+		for page in pages:
+			self.check_cancelled()
+
+			with self.instrumentation.stage('html'):
+				save_path = self.write_report(*page)
+
+			self.report_progress('rank', playlists.page_label(*page), save_path)
+
+		# and once more at the end, with the summary of the run
+		with self.instrumentation.stage('html'):
+			self.write_index()
+
+	def scenario_processed(self, scenario_name):
+		self.report_progress('scenario', scenario_name)
+		self.check_cancelled()
+
+	def report_progress(self, event, name, path=None):
+		self.progress_done += 1
+
+		if self.progress is not None:
+			self.progress({'event': event, 'name': name, 'path': path, 'done': self.progress_done, 'total': self.progress_total})
+
+	def report_watching(self):
+		if self.progress is not None:
+			self.progress({'event': 'watching', 'name': self.stats_folder, 'path': self.path_index, 'done': self.progress_done, 'total': self.progress_total})
+
+	def check_cancelled(self):
+		if self.cancel_event is not None and self.cancel_event.is_set():
+			raise GenerationCancelled('Report generation cancelled.')
+
+	def write_index(self):
+		return self.write_page(self.path_index, self.index_content())
+
+	def index_content(self):
+		return templates.index.substitute(table=templates.data_table(self.instrumentation.summary()))
+
+	def write_report(self, playlist_name, rank):
+		return self.write_page(self.get_page_path(playlist_name, rank), self.report_content(playlist_name, rank))
+
+	def report_content(self, playlist_name, rank):
+		# pages are put together from the templates and the cached header, then written in one go
+		scenarios_template = self.get_playlists().get_template(playlist_name, rank)
+		scenarios = self.generate_scenarios(scenarios_template)
+		scenarios_data = self.generate_scenario_data(scenarios)
+		if self.graph_renderer is not None:
+			self.generate_graphs(scenarios, scenarios_data)
+
+		playlists = self.get_playlists()
+		charts = []
+		content = []
+
+		for sc_type in [Playlist.tracking, Playlist.clicking, Playlist.switching]:
+			blocks = []
+			evaluations = []
+
+			for sc_name in scenarios_data[sc_type]:
+				sc_data = scenarios_data[sc_type][sc_name]
+
+				# rank scoring, only for scenarios the playlist has thresholds for
+				thresholds = playlists.get_thresholds(playlist_name, sc_name)
+				evaluation = self.scoring.evaluate((playlist_name, sc_name), thresholds, sc_data)
+				if thresholds is not None:
+					evaluations.append(evaluation)
+
+				if sc_data is None:
+					contents = 'Data not found.'
+				else:
+					contents = templates.scenario_data.substitute(graph=self.graph_html(sc_name, sc_type, sc_data, charts),
+																	alltime=self.trends_table(sc_data['total_trends'], best=(sc_data['best_score'], sc_data['best_date'])),
+																	last20=self.trends_table(sc_data['last20_trends'], sc_data['rolling']),
+																	ranking=self.ranking_html(evaluation))
+
+				blocks.append(templates.scenario.substitute(name=templates.escape(sc_name), contents=contents))
+
+			aggregate = ScoringEngine.aggregate(evaluations)
+			energy = '' if aggregate is None else templates.energy.substitute(energy=templates.number(aggregate['energy']), points=templates.number(aggregate['points']))
+
+			content.append(templates.scenario_type.substitute(type=sc_type, title=sc_type.capitalize(), energy=energy, scenarios=''.join(blocks)))
+
+		# after the canvases, the script draws every chart of the page once loaded
+		if self.graphs and self.charts == Playlist.charts_js:
+			content.append(templates.charts.substitute(data=json.dumps(charts, separators=(',', ':')).replace('</', '<\\/'),
+														src=self.relative_href(self.path_charts_script, self.path_pages)))
+
+		return ''.join(content)
+
+	def write_page(self, save_path, content):
+		with open(save_path, 'w') as fp:
+			fp.write(self.render_page(os.path.dirname(save_path), content))
+
+		return save_path
+
+	def render_page(self, folder, content):
+		# folder: where the page lives, links to the stylesheet and the other pages are relative to it
+		return templates.page.substitute(css=self.relative_href(self.path_style, folder), header=self.get_header(folder), content=content)
+
+	def get_header(self, folder):
+		# header and navbar, built once per page folder (and day, for the last update date)
+		date_str = datetime.datetime.now().strftime('%Y-%m-%d')
+
+		if (folder, date_str) not in self.headers:
+			playlists = self.get_playlists()
+			navbars = []
+
+			for playlist_name in playlists.playlists:
+				links = ''.join(templates.nav_link.substitute(rank=templates.escape_attribute(PlaylistRegistry.slug(rank)),
+																href=templates.escape_attribute(self.relative_href(self.get_page_path(playlist_name, rank), folder)),
+																label=templates.escape(rank.capitalize()))
+								for rank in playlists.playlists[playlist_name])
+				# with several playlists each navbar is labelled with its playlist
+				label = templates.playlist_label.substitute(name=templates.escape(playlist_name)) if len(playlists.playlists) > 1 else ''
+				navbars.append(templates.navbar.substitute(label=label, links=links))
+
+			self.headers[(folder, date_str)] = templates.header.substitute(date=date_str, navbars=''.join(navbars))
+
+		return self.headers[(folder, date_str)]
+
+	def graph_html(self, sc_name, sc_type, sc_data, charts):
+		if not self.graphs:
+			return ''
+
+		if self.charts == Playlist.charts_js:
+			# the payloads are written once per page as a json block, the canvas keeps its index
+			charts.append(chart_payload(sc_data['all']['date'], sc_data['all']['score'], 20, Playlist.color_style[sc_type]))
+
+			return templates.graph_canvas.substitute(index=len(charts) - 1)
+
+		return templates.graph_img.substitute(src=templates.escape_attribute(f'../imgs/{sc_name}.png'))
+
+	def trends_table(self, trends, rolling=None, best=None):
+		# best: (score, date) of the best single run, shown when its date is known
+		rows = [
+				('Max', templates.number(trends['max']['score'])),
+				('Min', templates.number(trends['min']['score'])),
+				('Average', templates.number(trends['average']['score'])),
+				('StDev', templates.number(trends['stdev']['score']))
+				]
+
+		if best is not None and best[1] is not None:
+			rows.append(('Best run', templates.number(best[0])))
+			rows.append(('Best run on', best[1].strftime('%Y-%m-%d')))
+
+		if rolling is not None:
+			rows.append(('Median', templates.number(rolling['median'][-1])))
+			if rolling['trend'] is not None:
+				rows.append(('Trend', templates.signed(rolling['trend'])))
+
+		return templates.data_table(rows)
+
+	def ranking_html(self, evaluation):
+		if evaluation is None:
+			return ''
+
+		rows = [
+				('Current', (evaluation['current'] or 'Unranked').capitalize()),
+				('Best', (evaluation['best'] or 'Unranked').capitalize()),
+				('Energy', templates.number(evaluation['energy']))
+				]
+
+		return templates.ranking.substitute(table=templates.data_table(rows))
+
+	def relative_href(self, path, folder):
+		# pages link to each other relatively, the report folder can be moved around
+		return os.path.relpath(path, folder).replace(os.sep, '/')
+
+	def copy_assets(self):
+		# the stylesheet and chart script are linked by every page instead of being inlined
+		shutil.copyfile(self.path_css, self.path_style)
+		if self.graphs and self.charts == Playlist.charts_js:
+			shutil.copyfile(self.path_charts_js, self.path_charts_script)
 
 	def generate_folders(self):
-		for path_ in [Playlist.path_files, Playlist.path_imgs, Playlist.path_pages]:
-			if not os.path.isdir(path_):
-				os.mkdir(path_)
+		for path_ in [self.path_files, self.path_imgs, self.path_pages]:
+			os.makedirs(path_, exist_ok=True)
+
+	def get_playlists(self):
+		if self.playlists is None:
+			self.playlists = PlaylistRegistry(self.path_playlists)
 
-	def get_rank_template(self, rank):
-		if Playlist.playlist_json is None:
-			with open(Playlist.path_playlists_json, 'r') as fp:
-				Playlist.playlist_json = json.load(fp)
+		return self.playlists
 
-		return Playlist.playlist_json[rank]
+	def get_page_path(self, playlist_name, rank):
+		return os.path.join(self.path_pages, self.get_playlists().page_filename(playlist_name, rank))
@@ -0,0 +1,100 @@
+import os
+import re
+import json
+
+from vkr_modules.exceptions import PlaylistError
+
+
+class PlaylistRegistry:
+	# benchmark playlists loaded from json files: {"name": ..., "ranks": {rank: {scenario type: [scenario names]}}},
+	# a file holding the ranks alone is named after the file. Ranks keep their file order.
+	# Optional "thresholds": {scenario name: {rank: score needed}} enables rank scoring for those scenarios.
+	scenario_types = ['tracking', 'clicking', 'switching']
+
+	def __init__(self, paths=None):
+		self.playlists = dict()
+		self.thresholds = dict()
+		# scenario name -> [(playlist name, rank, scenario type)], every page listing it
+		self.scenarios = dict()
+
+		for path in paths if paths is not None else []:
+			self.load(path)
+
+	def load(self, path):
+		with open(path, 'r') as fp:
+			playlist_json = json.load(fp)
+
+		if 'ranks' in playlist_json:
+			name = playlist_json.get('name', os.path.splitext(os.path.basename(path))[0])
+			ranks = playlist_json['ranks']
+			thresholds = playlist_json.get('thresholds', dict())
+		else:
+			name = os.path.splitext(os.path.basename(path))[0]
+			ranks = playlist_json
+			thresholds = dict()
+
+		if name in self.playlists:
+			raise PlaylistError(f'Playlist "{name}" is loaded twice ({path}).')
+
+		for rank in ranks:
+			for scenario_type in ranks[rank]:
+				if scenario_type not in PlaylistRegistry.scenario_types:
+					raise PlaylistError(f'Unknown scenario type "{scenario_type}" in {name} / {rank} ({path}), expected one of {", ".join(PlaylistRegistry.scenario_types)}.')
+
+		for scenario_name in thresholds:
+			for rank, score in thresholds[scenario_name].items():
+				if not isinstance(score, (int, float)):
+					raise PlaylistError(f'Threshold of {scenario_name} / {rank} in {name} is not a number ({path}).')
+
+		self.playlists[name] = ranks
+		self.thresholds[name] = thresholds
+
+		for rank in ranks:
+			for scenario_type in ranks[rank]:
+				for scenario_name in ranks[rank][scenario_type]:
+					self.scenarios.setdefault(scenario_name, []).append((name, rank, scenario_type))
+
+		return name
+
+	def get_pages(self):
+		# [(playlist name, rank)], one report page each
+		return [(name, rank) for name in self.playlists for rank in self.playlists[name]]
+
+	def get_template(self, playlist_name, rank):
+		return self.playlists[playlist_name][rank]
+
+	def get_thresholds(self, playlist_name, scenario_name):
+		return self.thresholds[playlist_name].get(scenario_name)
+
+	def get_scenario_names(self):
+		return list(self.scenarios)
+
+	def get_scenario_type(self, scenario_name):
+		# the first page listing a scenario decides its type
+		return self.scenarios[scenario_name][0][2]
+
+	def get_pages_for(self, scenario_names):
+		# pages listing any of the scenarios, in page order
+		pages = {(name, rank) for scenario_name in scenario_names for name, rank, _ in self.scenarios.get(scenario_name, [])}
+
+		return [page for page in self.get_pages() if page in pages]
+
+	def get_page_scenarios(self, pages):
+		return list(dict.fromkeys(scenario_name for name, rank in pages for names in self.playlists[name][rank].values() for scenario_name in names))
+
+	def page_filename(self, playlist_name, rank):
+		# a single playlist keeps the historical report_<rank>.html names
+		if len(self.playlists) == 1:
+			return f'report_{PlaylistRegistry.slug(rank)}.html'
+
+		return f'report_{PlaylistRegistry.slug(playlist_name)}_{PlaylistRegistry.slug(rank)}.html'
+
+	def page_label(self, playlist_name, rank):
+		if len(self.playlists) == 1:
+			return rank.capitalize()
+
+		return f'{playlist_name} {rank.capitalize()}'
+
+	@staticmethod
+	def slug(name):
+		return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
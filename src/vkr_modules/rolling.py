@@ -0,0 +1,73 @@
+import numpy as np
+
+# trailing rolling-window statistics over a series, the window is shorter at the
+# start of the series (point i covers values[max(0, i-window+1): i+1])
+
+
+def window_bounds(n, window):
+	ends = np.arange(1, n + 1)
+	starts = np.maximum(0, ends - window)
+
+	return starts, ends
+
+
+def rolling_mean(values, window):
+	values = np.asarray(values, dtype='f8')
+	starts, ends = window_bounds(len(values), window)
+
+	cumsum = np.concatenate(([0.0], np.cumsum(values)))
+
+	return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+
+def rolling_std(values, window, ddof=1):
+	values = np.asarray(values, dtype='f8')
+	starts, ends = window_bounds(len(values), window)
+	counts = ends - starts
+
+	# centre the series first so the sum-of-squares difference does not cancel out
+	centred = values - (values.mean() if len(values) > 0 else 0.0)
+	cumsum = np.concatenate(([0.0], np.cumsum(centred)))
+	cumsum_sq = np.concatenate(([0.0], np.cumsum(centred**2)))
+
+	sums = cumsum[ends] - cumsum[starts]
+	sums_sq = cumsum_sq[ends] - cumsum_sq[starts]
+
+	dof = counts - ddof
+	variance = np.zeros(len(values))
+	np.divide(sums_sq - sums**2/counts, dof, out=variance, where=dof > 0)
+
+	return np.sqrt(np.maximum(variance, 0.0))
+
+
+def rolling_percentile(values, window, q):
+	values = np.asarray(values, dtype='f8')
+	if len(values) == 0:
+		return values
+
+	window = min(window, len(values))
+	padded = np.concatenate((np.full(window - 1, np.nan), values))
+	# sorted windows, the padding sorts last, so each window's values are its first counts entries
+	windows = np.sort(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+	starts, ends = window_bounds(len(values), window)
+	counts = ends - starts
+
+	# linear interpolation between the closest ranks, as numpy's percentile does it
+	position = (counts - 1) * (q / 100)
+	lower = np.floor(position).astype(np.intp)
+	upper = np.minimum(lower + 1, counts - 1)
+	fraction = position - lower
+
+	rows = np.arange(len(values))
+	a, b = windows[rows, lower], windows[rows, upper]
+	diff = b - a
+
+	return np.where(fraction >= 0.5, b - diff * (1 - fraction), a + diff * fraction)
+
+
+def rolling_stats(values, window):
+	return {
+			'mean': rolling_mean(values, window),
+			'stdev': rolling_std(values, window),
+			'median': rolling_percentile(values, window, 50),
+	}
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class RunBatch:
+	# columnar container for runs/sessions of a scenario, one structured array
+	# instead of a list of per-run dicts
+	fields = ['shots', 'hits', 'accuracy', 'dmg_done', 'dmg_possible', 'kills', 'avg_ttk', 'score']
+	dtype = np.dtype([('date', 'datetime64[us]')] + [(field, 'f8') for field in fields])
+
+	__slots__ = ['array']
+
+	def __init__(self, array):
+		self.array = array
+
+	@classmethod
+	def from_runs(cls, runs):
+		array = np.empty(len(runs), dtype=cls.dtype)
+
+		array['date'] = [run['date'] for run in runs]
+		for field in cls.fields:
+			array[field] = [run[field] for run in runs]
+
+		return cls(array)
+
+	def __len__(self):
+		return len(self.array)
+
+	def __getitem__(self, key):
+		# column by name, dict view of a single run, or a sub-batch for slices
+		if isinstance(key, str):
+			return self.array[key]
+		elif isinstance(key, slice):
+			return RunBatch(self.array[key])
+
+		run = self.array[key]
+		run_dict = {'date': run['date'].item()}
+		run_dict.update({field: run[field].item() for field in RunBatch.fields})
+
+		return run_dict
+
+	def __iter__(self):
+		for i in range(len(self.array)):
+			yield self[i]
+
+	def last(self, n):
+		return RunBatch(self.array[max(0, len(self.array) - n):])
+
+	def dates(self):
+		return self.array['date'].astype(object).tolist()
+
+	def values(self):
+		# (n_runs, n_fields) float matrix for column-wise reductions
+		return np.column_stack([self.array[field] for field in RunBatch.fields])
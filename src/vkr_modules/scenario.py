@@ -1,226 +1,203 @@
 import os
 import datetime
-import statistics
 
-from vkr_modules.exceptions import NoStatFoundException, LastNError
+from vkr_modules.exceptions import NoStatFoundException, LastNError, StatFileError
+from vkr_modules.stat_parser import parse_stat_file
+from vkr_modules.runs import RunBatch
+from vkr_modules.sessions import SessionJoiner
+from vkr_modules.summary_index import ScenarioSummary
+from vkr_modules.ingest import Ingestor
+from vkr_modules.rolling import rolling_stats
+from vkr_modules.graphs import render_graph
+from vkr_modules.instrumentation import Instrumentation
 
 import numpy as np
-import matplotlib.dates
-import matplotlib.pyplot as plt
-from scipy.interpolate import make_interp_spline
 
 class Scenario:
-	csv_files = None
-
 	style_tracking = {'dots': '#E0FFFF', 'continuous': '#00FFFF', 'average': '#87CEFA'}
 	style_clicking = {'dots': '#FBCEB1', 'continuous': '#E62020', 'average': '#A52A2A'}
 	style_switching = {'dots': '#dcbaff', 'continuous': '#7f00ff', 'average': '#a055ed'}
 
-	def __init__(self, scenario_name, stats_folder):
-		self.scenario_name = scenario_name
-		self.stats_folder = stats_folder
+	session_threshold = datetime.timedelta(hours=2)
 
-		if Scenario.csv_files is None:
-			Scenario.csv_files = [f for f in os.listdir(self.stats_folder) if os.path.splitext(f)[1].lower() == '.csv']
+	def __init__(self, scenario_name, stat_index, ingestor=None, session_threshold=None, instrumentation=None, archive=None, summaries=None):
+		self.scenario_name = scenario_name
+		self.stat_index = stat_index
+		self.stats_folder = stat_index.stats_folder
+		self.ingestor = ingestor
+		# archived history, the stat index then only lists files newer than the archive
+		self.archive = archive
+		# persisted summaries, resumed so only stat files newer than them are read
+		self.summaries = summaries
+		self.summary = None
+		# files load_files could not read, without an ingestor
+		self.unreadable = set()
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+		if session_threshold is not None:
+			self.session_threshold = session_threshold
 
 	def process(self):
+		# runs are streamed batch by batch into the session joiner and the closed sessions into the
+		# running summary, a resumed summary carries on from its open session with the newer files only
 		scenario_files = self.get_files()
-		scenario_data_list = [self.parse_file(sf) for sf in scenario_files]
-		scenario_data_list = self.join_sessions(scenario_data_list)
+		summary = self.get_summary(scenario_files)
+		self.summary = None
+
+		joiner = SessionJoiner(self.session_threshold)
+		joiner.origin = summary.origin
+		joiner.open = summary.open
+
+		for runs in self.iter_runs(summary.pending, archived=not summary.resumed):
+			if len(runs) == 0:
+				continue
+
+			summary.add_runs(runs)
+
+			with self.instrumentation.stage('session_joining'):
+				joiner.add(runs)
+				summary.add_sessions(joiner.drain())
+
+		if summary.best_score is None:
+			raise NoStatFoundException(f'No readable files found for scenario: {self.scenario_name}.')
+
+		# files that failed to parse are kept aside and read again on the next update
+		failed = self.failed_files(summary.pending)
+		summary.close(joiner, scenario_files, failed)
+		if self.summaries is not None and (not summary.resumed or len(summary.pending) > len(failed)):
+			self.summaries.put(self.scenario_name, summary)
+
+		with self.instrumentation.stage('session_joining'):
+			last = joiner.finish()
+			sessions = summary.get_sessions(last)
+
+		with self.instrumentation.stage('trends'):
+			return self.summarize(sessions, summary.best_score, summary.get_trends(last), summary.best_date.item())
+
+	def get_summary(self, scenario_files):
+		# kept until process() so the registry and process() agree on the files to read
+		if self.summary is None:
+			archive_chunks = self.archive.chunk_files(self.scenario_name) if self.archive is not None else []
+
+			if self.summaries is not None:
+				self.summary = self.summaries.resume(self.scenario_name, scenario_files, self.session_threshold, archive_chunks)
+			else:
+				self.summary = ScenarioSummary(self.session_threshold, archive_chunks)
+				self.summary.pending = scenario_files
 
-		last20_data = scenario_data_list[len(scenario_data_list)-20: len(scenario_data_list)]
+		return self.summary
 
-		total_trends = self.calculate_trends(scenario_data_list)
-		last20_trends = self.calculate_trends(scenario_data_list, 20)
+	def pending_files(self):
+		# the stat files process() will read
+		return self.get_summary(self.stat_index.get_files(self.scenario_name)).pending
 
-		data = {'all': scenario_data_list,
+	def failed_files(self, stat_files):
+		unreadable = self.ingestor.failed if self.ingestor is not None else self.unreadable
+
+		return [sf for sf in stat_files if sf.filename in unreadable]
+
+	def summarize(self, sessions, best_score=None, total_trends=None, best_date=None):
+		last20_data = sessions.last(20)
+
+		# total_trends: already known from a running summary
+		if total_trends is None:
+			total_trends = self.calculate_trends(sessions)
+		last20_trends = self.calculate_trends(sessions, 20)
+		# the last median and the trend only depend on the last two windows
+		rolling = self.calculate_rolling(sessions.last(40), 20)
+
+		data = {'all': sessions,
 				'last20': last20_data,
 				'total_trends': total_trends,
-				'last20_trends': last20_trends}
+				'last20_trends': last20_trends,
+				'rolling': rolling,
+				# best single run, sessions only keep averages
+				'best_score': best_score if best_score is not None else total_trends['max']['score'],
+				'best_date': best_date}
 
 		return data
 
 	def get_files(self):
-		scenario_files = [f for f in Scenario.csv_files if f.split(' - ')[0] == self.scenario_name]
+		scenario_files = self.stat_index.get_files(self.scenario_name)
+		archived = self.archive is not None and self.scenario_name in self.archive
 
-		if len(scenario_files) == 0:
+		if len(scenario_files) == 0 and not archived:
 			raise NoStatFoundException(f'No files found for scenario: {self.scenario_name}.')
 
 		return scenario_files
 
-	def parse_file(self, scenario_file):
-		date_str = os.path.splitext(scenario_file)[0].split(' - ')[2].strip(' Stats')
-		date = datetime.datetime.strptime(date_str, '%Y.%m.%d-%H.%M.%S')
-
-		with open(os.path.join(self.stats_folder, scenario_file), 'r') as fp:
-			block = 1
-			for line in fp:
-				if line == '\n':
-					block += 1
-				else:
-					if block == 1:
-						pass
-
-					elif block == 2:
-						if 'Weapon,Shots,Hits,Damage Done,Damage Possible' in line:
-							pass
-						else:
-							split = line.strip('n').split(',')
-
-							weapon = split[0]
-							shots = int(split[1])
-							hits = int(split[2])
-							accuracy = hits/shots if shots > 0 else 1
-							dmg_done = float(split[3])
-							dmg_possible = float(split[4])
-
-					elif block == 3:
-						if 'Kills:,' in line:
-							kills = int(line.strip('\n').split(',')[1])
-						elif 'Avg TTK:,' in line:
-							avg_ttk = float(line.strip('\n').split(',')[1])
-						elif 'Score:,' in line:
-							score = float(line.strip('\n').split(',')[1])
-
-					elif block == 4:
-						pass
-		
-		scenario_data = {
-							'date': date,
-							'shots': shots,
-							'hits': hits,
-							'accuracy': accuracy,
-							'dmg_done': dmg_done,
-							'dmg_possible': dmg_possible,
-							'kills': kills,
-							'avg_ttk': avg_ttk,
-							'score': score
-		}
+	def iter_runs(self, scenario_files, archived=True):
+		# archived history first, then the live files in date order
+		if archived and self.archive is not None and self.scenario_name in self.archive:
+			yield from self.archive.iter_chunks(self.scenario_name)
 
-		return scenario_data
+		if self.ingestor is not None:
+			for runs in self.ingestor.load_batches(scenario_files):
+				with self.instrumentation.stage('loading'):
+					batch = RunBatch.from_runs(runs)
 
-	def join_sessions(self, scenario_data_list, time_threshold=datetime.timedelta(hours=2)):
-		scenario_data_cleaned = []
+				yield batch
+			return
 
-		while len(scenario_data_list) > 0:
-			data0 = scenario_data_list.pop(0)
+		for i in range(0, len(scenario_files), Ingestor.batch_size):
+			with self.instrumentation.stage('loading'):
+				batch = RunBatch.from_runs(self.load_files(scenario_files[i:i + Ingestor.batch_size]))
 
-			to_be_joined = [data0]
-			i = 0
-			while i < len(scenario_data_list):
-				if abs(scenario_data_list[i]['date'] - data0['date']) <= time_threshold:
-					to_be_joined.append(scenario_data_list[i])
-					scenario_data_list.pop(i)
-				else:
-					i += 1
+			yield batch
 
-			session_average = self.calculate_trends(to_be_joined, None)['average']
-			session_average['date'] = datetime.datetime.fromtimestamp(statistics.mean([sd['date'].timestamp() for sd in to_be_joined]))
+	def load_files(self, scenario_files):
+		scenario_data_list = []
+		for sf in scenario_files:
+			try:
+				scenario_data_list.append(self.parse_file(sf))
+				self.unreadable.discard(sf.filename)
+			except (OSError, StatFileError):
+				self.unreadable.add(sf.filename)
 
-			scenario_data_cleaned.append(session_average)
+		return scenario_data_list
 
-		return scenario_data_cleaned
+	def parse_file(self, stat_file):
+		scenario_data = {'date': stat_file.date}
+		scenario_data.update(parse_stat_file(os.path.join(self.stats_folder, stat_file.filename)))
 
-	def calculate_trends(self, scenario_data_list, last_n=None):
-		n = len(scenario_data_list)
+		return scenario_data
+
+	def join_sessions(self, runs, time_threshold=None):
+		# sessions of a whole batch at once, the caller's batch is left untouched
+		joiner = SessionJoiner(time_threshold if time_threshold is not None else self.session_threshold)
+		joiner.add(runs)
+
+		return joiner.finish()
 
-		if last_n is None:
-			last_n = n
-		else:
+	def calculate_trends(self, runs, last_n=None):
+		if last_n is not None:
 			if last_n <= 0:
 				raise LastNError(f'last_n should be set to a positive integer || Current value: {last_n}')
 
-			last_n = min(n, last_n)
-			scenario_data_list = scenario_data_list[n-last_n: n]
+			runs = runs.last(last_n)
 
-		averages = dict()
-		stdevs = dict()
+		values = runs.values()
+
+		averages = values.mean(axis=0)
+		stdevs = values.std(axis=0, ddof=1) if len(runs) > 1 else np.zeros(len(RunBatch.fields))
+
+		trends = {
+					'average': dict(zip(RunBatch.fields, averages.tolist())),
+					'stdev': dict(zip(RunBatch.fields, stdevs.tolist())),
+					'max': dict(zip(RunBatch.fields, values.max(axis=0).tolist())),
+					'min': dict(zip(RunBatch.fields, values.min(axis=0).tolist()))
+		}
 
-		if len(scenario_data_list) == 1:
-			averages = scenario_data_list[0].copy()
-			stdevs = {key: 0 for key in scenario_data_list[0]}
-			
-			del averages['date']
-			del stdevs['date']
+		return trends
 
-		else:
-			for key in scenario_data_list[0]:
-				if key == 'date':
-					continue
+	def calculate_rolling(self, runs, window):
+		rolling = rolling_stats(runs['score'], window)
 
-				key_list = [scenario_data[key] for scenario_data in scenario_data_list]
-				averages[key] = statistics.mean(key_list)
-				stdevs[key] = statistics.stdev(key_list)
+		# how much the rolling average moved over the last window, once there are two full windows to compare
+		rolling_mean = rolling['mean']
+		rolling['trend'] = float(rolling_mean[-1] - rolling_mean[-1 - window]) if len(rolling_mean) >= 2*window else None
 
-		return {'average': averages, "stdev": stdevs}
+		return rolling
 
 	def generate_graph(self, scenario_data_list, average_threshold, color_style, save_path):
-		# raw data
-		dates = [sd['date'] for sd in scenario_data_list]
-		dates_n = matplotlib.dates.date2num(dates)
-		scores = [sd['score'] for sd in scenario_data_list]
-
-		# calculate last k averages for each score
-		scores_average = []
-		for i in range(len(scores)):
-			i_min = max(0, i - average_threshold)
-			i_max = i + 1
-			i_neighbours = scores[i_min: i_max]
-			scores_average.append(statistics.mean(i_neighbours))
-
-		# spline interpolation
-		if len(dates) >= 3:
-			dates_continuous = np.linspace(dates_n.min(), dates_n.max(), 500)
-
-			spl_scores = make_interp_spline(dates_n, scores, k=2)
-			scores_continuous = spl_scores(dates_continuous)
-
-			spl_averages = make_interp_spline(dates_n, scores_average, k=2)
-			averages_continuous = spl_averages(dates_continuous)
-
-		# prepare figure
-		fig, ax = plt.subplots(figsize=(10, 2))
-
-		# set colors and graph style
-		fig.set_facecolor('#7F00FF')
-		ax.set_facecolor('#7F00FF')
-
-		ax.spines['bottom'].set_color('white')
-		ax.spines['top'].set_color('white')
-		ax.tick_params(colors='white')
-
-		ax.spines['left'].set_visible(False)
-		ax.spines['right'].set_visible(False)
-
-		# y/x ticks
-		yticks = [(max(scores)-min(scores))/4*i + min(scores) for i in range(0, 4+1)]
-		plt.yticks(yticks)
-
-		xtick0 = min(dates_n)
-		xtick1 = 0.5*(max(dates_n) - min(dates_n)) + xtick0
-		xtick2 = 0.5*(max(dates_n) - xtick1) + xtick1
-		xtick3 = 0.5*(max(dates_n) - xtick2) + xtick2
-		xtick4 = max(dates_n)
-		xticks = [xtick0, xtick1, xtick2, xtick3, xtick4]
-
-		xtickdates = [matplotlib.dates.num2date(d) for d in xticks]
-		xticklabels = [(d.replace(tzinfo=None)-datetime.datetime.now()).days for d in matplotlib.dates.num2date(xticks)]
-		plt.xticks(xticks, rotation=0, fontsize=8, labels=xticklabels)
-
-		for y in yticks[1:4]:
-			plt.axhline(y=y, color='gray', linestyle='-', alpha=0.2, linewidth=1)
-
-		for x in xticks[1:4]:
-			plt.axvline(x=x, color='gray', linestyle='--', alpha=0.2, linewidth=1)
-	
-		# plotting
-		if len(dates) >= 3:
-			plt.plot(dates_continuous, averages_continuous, '--', color=color_style['average'], alpha=0.5)
-			plt.plot(dates_continuous, scores_continuous, '-', color=color_style['continuous'], linewidth=1.75)
-			plt.plot(dates, scores, 'o', markersize=5, color=color_style['dots'])
-		else:
-			plt.plot(dates, scores, '-', color=color_style['continuous'])
-			plt.plot(dates, scores, 'o', markersize=5, color=color_style['dots'])
-
-		plt.tight_layout()
-		plt.savefig(save_path, transparent=True)
+		render_graph(scenario_data_list['date'], scenario_data_list['score'], average_threshold, color_style, save_path)
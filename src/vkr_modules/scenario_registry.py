@@ -0,0 +1,54 @@
+from vkr_modules.scenario import Scenario
+from vkr_modules.exceptions import NoStatFoundException
+
+
+class ScenarioRegistry:
+	# run-level registry: every scenario name is parsed, aggregated and graphed once,
+	# no matter how many rank templates list it
+	def __init__(self, stat_index, ingestor=None, instrumentation=None, archive=None, summaries=None):
+		self.stat_index = stat_index
+		self.ingestor = ingestor
+		self.instrumentation = instrumentation
+		self.archive = archive
+		self.summaries = summaries
+
+		self.scenarios = dict()
+		self.scenarios_data = dict()
+		self.graphed = set()
+
+	def get_scenario(self, scenario_name, session_threshold=None):
+		if scenario_name not in self.scenarios:
+			self.scenarios[scenario_name] = Scenario(scenario_name, self.stat_index, self.ingestor, session_threshold, self.instrumentation, self.archive, self.summaries)
+
+		return self.scenarios[scenario_name]
+
+	def process(self, scenario_names, callback=None):
+		new_names = [name for name in dict.fromkeys(scenario_names) if name not in self.scenarios_data]
+
+		# scenarios are parsed in batches and processed one at a time, their runs are released
+		# as soon as the sessions are joined so memory does not grow with the size of the folder,
+		# scenarios with a stored summary only parse the files newer than it
+		file_groups = [self.get_scenario(name).pending_files() for name in new_names]
+		if self.ingestor is not None:
+			file_groups = self.ingestor.iter_batches(file_groups)
+
+		for scenario_name, _ in zip(new_names, file_groups):
+			try:
+				self.scenarios_data[scenario_name] = self.get_scenario(scenario_name).process()
+			except NoStatFoundException:
+				self.scenarios_data[scenario_name] = None
+
+			if callback is not None:
+				callback(scenario_name)
+
+	def get_data(self, scenario_name):
+		if scenario_name not in self.scenarios_data:
+			self.process([scenario_name])
+
+		return self.scenarios_data[scenario_name]
+
+	def invalidate(self, scenario_names):
+		for scenario_name in scenario_names:
+			self.scenarios.pop(scenario_name, None)
+			self.scenarios_data.pop(scenario_name, None)
+			self.graphed.discard(scenario_name)
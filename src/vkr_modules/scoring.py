@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class RankScorer:
+	# the rank ladder of one scenario, {rank: score needed to reach it}, scores are ranked
+	# with a binary search over the thresholds
+	energy_step = 100
+
+	def __init__(self, thresholds):
+		ladder = sorted(thresholds.items(), key=lambda item: item[1])
+
+		self.ranks = [rank for rank, _ in ladder]
+		self.thresholds = np.array([score for _, score in ladder], dtype='f8')
+
+		# bounds of the band each rank index sits in, the top rank has no next threshold
+		self.lower = np.concatenate(([0.0], self.thresholds))
+		self.upper = np.concatenate((self.thresholds, [np.inf]))
+
+	def rank_indices(self, scores):
+		# 0 below the first threshold, i once self.ranks[i-1] is reached
+		return np.searchsorted(self.thresholds, np.asarray(scores, dtype='f8'), side='right')
+
+	def energy(self, scores):
+		# energy_step per rank reached plus the fraction of the way to the next one
+		scores = np.asarray(scores, dtype='f8')
+		indices = self.rank_indices(scores)
+
+		lower = self.lower[indices]
+		upper = self.upper[indices]
+
+		with np.errstate(divide='ignore', invalid='ignore'):
+			fraction = np.where(np.isfinite(upper) & (upper > lower), (scores - lower) / (upper - lower), 0.0)
+
+		return (indices + np.clip(fraction, 0.0, 1.0)) * RankScorer.energy_step
+
+	def rank_name(self, index):
+		return self.ranks[index - 1] if index > 0 else None
+
+	def evaluate(self, session_scores, best_score):
+		# current: rank of the latest session, best: rank of the best run ever played
+		current_index, best_index = self.rank_indices([session_scores[-1], best_score]).tolist()
+
+		return {
+				'current': self.rank_name(current_index),
+				'best': self.rank_name(best_index),
+				'energy': float(self.energy([best_score])[0])
+		}
+
+
+class ScoringEngine:
+	# rank evaluation of every scenario that has thresholds, plus per category aggregates
+	def __init__(self):
+		self.scorers = dict()
+
+	def get_scorer(self, key, thresholds):
+		if key not in self.scorers:
+			self.scorers[key] = RankScorer(thresholds)
+
+		return self.scorers[key]
+
+	def evaluate(self, key, thresholds, sc_data):
+		if thresholds is None or len(thresholds) == 0 or sc_data is None:
+			return None
+
+		return self.get_scorer(key, thresholds).evaluate(sc_data['all']['score'], sc_data['best_score'])
+
+	@staticmethod
+	def aggregate(evaluations):
+		# energy of a category: average over its ranked scenarios (unplayed ones count as 0), points: their sum
+		energies = np.array([0.0 if evaluation is None else evaluation['energy'] for evaluation in evaluations], dtype='f8')
+
+		if len(energies) == 0:
+			return None
+
+		return {'energy': float(energies.mean()), 'points': float(energies.sum())}
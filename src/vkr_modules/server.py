@@ -0,0 +1,237 @@
+import os
+import threading
+import collections
+import urllib.parse
+import http.server
+import concurrent.futures
+
+from vkr_modules.watcher import StatWatcher
+from vkr_modules.exceptions import ServerError
+
+
+class PageCache:
+	# rendered responses by url path, least recently used first out
+	def __init__(self, size):
+		self.size = size
+		self.entries = collections.OrderedDict()
+
+	def get(self, path):
+		if path not in self.entries:
+			return None
+
+		self.entries.move_to_end(path)
+
+		return self.entries[path]
+
+	def put(self, path, response):
+		self.entries[path] = response
+		self.entries.move_to_end(path)
+
+		while len(self.entries) > self.size:
+			self.entries.popitem(last=False)
+
+	def evict(self, paths):
+		for path in paths:
+			self.entries.pop(path, None)
+
+
+class ReportHandler(http.server.BaseHTTPRequestHandler):
+	def do_GET(self):
+		response = self.server.report.get(urllib.parse.unquote(urllib.parse.urlsplit(self.path).path))
+
+		if response is None:
+			self.send_error(404)
+			return
+
+		content_type, body = response
+		self.send_response(200)
+		self.send_header('Content-Type', content_type)
+		self.send_header('Content-Length', str(len(body)))
+		# pages change as new stat files come in, the browser always asks again
+		self.send_header('Cache-Control', 'no-cache')
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class ReportServer:
+	# serves a report from memory on localhost: pages (and their png graphs) are rendered on their first
+	# request and kept in an LRU cache, new stat files evict the pages and graphs of their scenarios so
+	# the next request renders them again. Nothing is fetched from outside the machine.
+	host = '127.0.0.1'
+	port = 8000
+	cache_size = 64
+
+	content_types = {
+						'.html': 'text/html; charset=utf-8',
+						'.css': 'text/css; charset=utf-8',
+						'.js': 'text/javascript; charset=utf-8',
+						'.png': 'image/png'
+						}
+
+	def __init__(self, playlist, port=None, cache_size=None):
+		self.playlist = playlist
+		self.port = port if port is not None else ReportServer.port
+		self.cache = PageCache(cache_size if cache_size is not None else ReportServer.cache_size)
+		self.lock = threading.Lock()
+		# the pipeline (sqlite connection included) lives on a single thread, opened, used by every
+		# render and update, and closed there, requests wait on it
+		self.renderer = None
+		self.httpd = None
+
+		playlists = self.playlist.get_playlists()
+		self.pages = {self.url(self.playlist.get_page_path(*page)): page for page in playlists.get_pages()}
+
+	def serve(self, on_ready=None, on_update=None):
+		# blocks until the playlist's cancel_event is set, on_ready(url) is called once listening
+		playlist = self.playlist
+		playlist.generate_folders()
+
+		stop_event = playlist.cancel_event if playlist.cancel_event is not None else threading.Event()
+		watcher = StatWatcher(playlist.stats_folder, lambda filenames: self.update(filenames, on_update), stop_event=stop_event)
+		watcher_thread = threading.Thread(target=watcher.run, daemon=True)
+
+		self.renderer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		self.renderer.submit(playlist.open_pipeline).result()
+
+		server_thread = None
+
+		try:
+			try:
+				self.httpd = http.server.ThreadingHTTPServer((ReportServer.host, self.port), ReportHandler)
+			except OSError as e:
+				raise ServerError(f'Cannot serve on {ReportServer.host}:{self.port}: {e.strerror}.')
+
+			self.httpd.daemon_threads = True
+			self.httpd.report = self
+
+			watcher_thread.start()
+			server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+			server_thread.start()
+
+			if on_ready is not None:
+				on_ready(f'http://{ReportServer.host}:{self.httpd.server_address[1]}/report.html')
+
+			# waited on in steps, so Ctrl+C gets through on Windows too
+			while not stop_event.wait(0.5):
+				pass
+		finally:
+			stop_event.set()
+			# shutdown() waits for serve_forever, only once it runs
+			if server_thread is not None:
+				self.httpd.shutdown()
+			if self.httpd is not None:
+				self.httpd.server_close()
+			if watcher_thread.ident is not None:
+				watcher_thread.join()
+
+			self.renderer.submit(playlist.close_pipeline).result()
+			self.renderer.shutdown()
+
+	def get(self, path):
+		# (content type, body) or None
+		if path == '/':
+			path = '/report.html'
+
+		with self.lock:
+			response = self.cache.get(path)
+
+		if response is None:
+			response = self.renderer.submit(self.render_once, path).result()
+
+		return response
+
+	def render_once(self, path):
+		# another request may have rendered it while this one waited
+		with self.lock:
+			response = self.cache.get(path)
+
+		if response is None:
+			response = self.render(path)
+
+			if response is not None:
+				with self.lock:
+					self.cache.put(path, response)
+
+		return response
+
+	def render(self, path):
+		playlist = self.playlist
+		content_type = ReportServer.content_types.get(os.path.splitext(path)[1])
+
+		if content_type is None:
+			return None
+
+		if path == self.url(playlist.path_index):
+			with playlist.instrumentation.stage('html'):
+				return content_type, playlist.render_page(playlist.root_folder, playlist.index_content()).encode()
+
+		if path in self.pages:
+			page = self.pages[path]
+			with playlist.instrumentation.stage('html'):
+				return content_type, playlist.render_page(playlist.path_pages, playlist.report_content(*page)).encode()
+
+		# every other page is rendered, never read from an earlier report on disk
+		file_path = self.file_path(path)
+		if file_path is None or path.endswith('.html'):
+			return None
+
+		# the graph is brought up to date first, its page may not have been opened yet
+		if os.path.dirname(file_path) == os.path.abspath(playlist.path_imgs):
+			self.render_graph(os.path.splitext(os.path.basename(file_path))[0])
+
+		if not os.path.isfile(file_path):
+			return None
+
+		with open(file_path, 'rb') as fp:
+			return content_type, fp.read()
+
+	def render_graph(self, scenario_name):
+		playlist = self.playlist
+		playlists = playlist.get_playlists()
+
+		if playlist.graph_renderer is None or scenario_name not in playlists.get_scenario_names():
+			return
+
+		scenario_type = playlists.get_scenario_type(scenario_name)
+		playlist.registry.get_scenario(scenario_name, playlist.session_thresholds[scenario_type])
+		playlist.generate_graphs(None, {scenario_type: {scenario_name: playlist.registry.get_data(scenario_name)}})
+
+	def update(self, filenames, on_update=None):
+		# called by the watcher: the scenarios of the new files are processed again on their next request
+		pages = self.renderer.submit(self.invalidate, filenames).result()
+
+		if on_update is not None:
+			on_update(pages)
+
+	def invalidate(self, filenames):
+		playlist = self.playlist
+		scenario_names = playlist.stat_index.add(filenames)
+		playlist.registry.invalidate(scenario_names)
+
+		pages = playlist.get_playlists().get_pages_for(scenario_names)
+		urls = [self.url(playlist.get_page_path(*page)) for page in pages]
+		urls += [self.url(os.path.join(playlist.path_imgs, f'{scenario_name}.png')) for scenario_name in scenario_names]
+		urls.append(self.url(playlist.path_index))
+
+		with self.lock:
+			self.cache.evict(urls)
+
+		playlist.save_pipeline()
+
+		return pages
+
+	def url(self, path):
+		return '/' + self.playlist.relative_href(path, self.playlist.root_folder)
+
+	def file_path(self, path):
+		# files under the report folder only
+		root = os.path.abspath(self.playlist.root_folder)
+		file_path = os.path.abspath(os.path.join(root, *path.lstrip('/').split('/')))
+
+		if os.path.commonpath([root, file_path]) != root:
+			return None
+
+		return file_path
@@ -0,0 +1,77 @@
+import numpy as np
+
+from vkr_modules.runs import RunBatch
+
+
+class SessionJoiner:
+	# joins runs into sessions batch by batch: a session starts at the earliest run not yet assigned
+	# and takes every run played within time_threshold of that start. Batches must come in date order,
+	# although a batch may reach back into the last session: only the runs of the last session (which
+	# the next batch may still extend) are kept between them.
+	# origin and open can be restored from a previous joiner to carry on where it stopped.
+	def __init__(self, time_threshold):
+		self.time_threshold = np.timedelta64(time_threshold)
+		# session dates are averaged relative to the first run, to keep float precision
+		self.origin = None
+		self.open = None
+		self.sessions = []
+
+	def add(self, runs):
+		array = runs.array
+
+		if self.open is not None:
+			array = np.concatenate((self.open, array))
+
+		array = array[np.argsort(array['date'], kind='stable')]
+
+		if len(array) == 0:
+			return
+
+		if self.origin is None:
+			self.origin = array['date'][0]
+
+		# each session end is found by binary search
+		dates = array['date']
+		starts = []
+		i = 0
+		while i < len(array):
+			starts.append(i)
+			i = int(np.searchsorted(dates, dates[i] + self.time_threshold, side='right'))
+
+		self.reduce(array[:starts[-1]], starts[:-1])
+		# copied, the rest of the batch is not kept alive through a view
+		self.open = array[starts[-1]:].copy()
+
+	def drain(self):
+		# sessions closed since the last call, the open one stays
+		sessions = np.concatenate(self.sessions) if len(self.sessions) > 0 else np.empty(0, dtype=RunBatch.dtype)
+		self.sessions = []
+
+		return sessions
+
+	def finish(self):
+		if self.open is not None:
+			self.reduce(self.open, [0])
+			self.open = None
+
+		if len(self.sessions) == 0:
+			return RunBatch(np.empty(0, dtype=RunBatch.dtype))
+
+		return RunBatch(np.concatenate(self.sessions))
+
+	def reduce(self, array, starts):
+		if len(starts) == 0:
+			return
+
+		starts = np.array(starts, dtype=np.intp)
+		counts = np.diff(np.append(starts, len(array)))
+
+		sessions = np.empty(len(starts), dtype=RunBatch.dtype)
+		for field in RunBatch.fields:
+			sessions[field] = np.add.reduceat(array[field], starts) / counts
+
+		offsets = (array['date'] - self.origin).astype('f8')
+		mean_offsets = np.add.reduceat(offsets, starts) / counts
+		sessions['date'] = self.origin + np.rint(mean_offsets).astype('timedelta64[us]')
+
+		self.sessions.append(sessions)
@@ -0,0 +1,97 @@
+import os
+import datetime
+import collections
+
+StatFile = collections.namedtuple('StatFile', ['filename', 'scenario_name', 'date'])
+
+
+class StatIndex:
+	def __init__(self, stats_folder, newer_than=None, absolute_paths=False):
+		self.stats_folder = stats_folder
+		# files up to this date are already in the run archive and left out of the index
+		self.newer_than = newer_than
+		# filenames joined with the stats folder, for an ingestor shared by several folders
+		self.absolute_paths = absolute_paths
+		self.scenarios = dict()
+
+		self.build()
+
+	def build(self):
+		# single pass over the stats folder, grouping files by scenario
+		scenarios = dict()
+
+		for filename in os.listdir(self.stats_folder):
+			stat_file = self.get_stat_file(filename)
+
+			if self.is_indexed(stat_file):
+				scenarios.setdefault(stat_file.scenario_name, []).append(stat_file)
+
+		for stat_files in scenarios.values():
+			stat_files.sort(key=lambda sf: sf.date)
+
+		self.scenarios = scenarios
+
+	def add(self, filenames):
+		# incremental update for files that appeared after build(), returns the affected scenario names
+		added = dict()
+
+		for filename in filenames:
+			stat_file = self.get_stat_file(filename)
+
+			if self.is_indexed(stat_file):
+				added.setdefault(stat_file.scenario_name, []).append(stat_file)
+
+		for scenario_name, new_files in added.items():
+			stat_files = self.scenarios.setdefault(scenario_name, [])
+			known = {sf.filename for sf in stat_files}
+
+			stat_files += [sf for sf in new_files if sf.filename not in known]
+			stat_files.sort(key=lambda sf: sf.date)
+
+		return list(added)
+
+	def get_stat_file(self, filename):
+		stat_file = StatIndex.parse_filename(filename)
+
+		if stat_file is not None and self.absolute_paths:
+			return stat_file._replace(filename=os.path.join(self.stats_folder, filename))
+
+		return stat_file
+
+	def is_indexed(self, stat_file):
+		return stat_file is not None and (self.newer_than is None or stat_file.date > self.newer_than)
+
+	def get_files(self, scenario_name):
+		return self.scenarios.get(scenario_name, [])
+
+	def __len__(self):
+		return sum(len(stat_files) for stat_files in self.scenarios.values())
+
+	@staticmethod
+	def parse_filename(filename):
+		# '<scenario> - <mode> - YYYY.MM.DD-HH.MM.SS Stats.csv'
+		stem, ext = os.path.splitext(filename)
+		if ext.lower() != '.csv':
+			return None
+
+		split = stem.split(' - ')
+		if len(split) < 3:
+			return None
+
+		date = StatIndex.parse_date(split[2].strip(' Stats'))
+		if date is None:
+			return None
+
+		return StatFile(filename, split[0], date)
+
+	@staticmethod
+	def parse_date(date_str):
+		# fixed-width slicing is much cheaper than strptime over 100k+ files
+		if len(date_str) != 19 or date_str[4] != '.' or date_str[10] != '-':
+			return None
+
+		try:
+			return datetime.datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+										int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19]))
+		except ValueError:
+			return None
@@ -0,0 +1,90 @@
+import os
+
+from vkr_modules.exceptions import StatFileError
+
+# A KovaaK's stat file is made of blank-line separated blocks: the kill log, the
+# weapon table, the summary (Kills, Avg TTK, Score, ...) and the settings. The kill
+# log grows with the length of the run, the blocks this parser needs are at the end.
+
+weapon_header = b'Weapon,Shots,Hits,Damage Done,Damage Possible'
+summary_keys = {b'Kills:': 'kills', b'Avg TTK:': 'avg_ttk', b'Score:': 'score'}
+
+# enough for the weapon table, summary and settings of a regular stat file
+tail_size = 4096
+
+
+def parse_stat_file(file_path):
+	# fast path reads the tail only, the whole file is read if the weapon table is not in it
+	with open(file_path, 'rb') as fp:
+		size = fp.seek(0, os.SEEK_END)
+		fp.seek(max(0, size - tail_size))
+		data = fp.read()
+
+		start = data.find(weapon_header)
+		if start < 0 and size > tail_size:
+			fp.seek(0)
+			data = fp.read()
+			start = data.find(weapon_header)
+
+	if start < 0:
+		raise StatFileError(f'No weapon table found in stat file: {file_path}')
+
+	return parse_blocks(data[start:].splitlines(), file_path)
+
+
+def parse_blocks(lines, file_path):
+	# lines start at the weapon table header
+	weapon = None
+	summary = dict()
+
+	i = 1
+	while i < len(lines) and lines[i].strip() != b'':
+		weapon = lines[i]
+		i += 1
+
+	for line in lines[i:]:
+		key, _, value = line.partition(b',')
+		field = summary_keys.get(key)
+
+		if field is not None:
+			summary[field] = value.split(b',', 1)[0]
+
+			if len(summary) == len(summary_keys):
+				break
+
+	if weapon is None or len(summary) < len(summary_keys):
+		raise StatFileError(f'Truncated stat file: {file_path}')
+
+	try:
+		split = weapon.split(b',')
+		shots = int(split[1])
+		hits = int(split[2])
+		dmg_done = float(split[3])
+		dmg_possible = float(split[4])
+
+		kills = int(summary['kills'])
+		avg_ttk = float(summary['avg_ttk'])
+		score = float(summary['score'])
+	except (IndexError, ValueError):
+		raise StatFileError(f'Malformed stat file: {file_path}')
+
+	scenario_data = {
+						'shots': shots,
+						'hits': hits,
+						'accuracy': hits/shots if shots > 0 else 1,
+						'dmg_done': dmg_done,
+						'dmg_possible': dmg_possible,
+						'kills': kills,
+						'avg_ttk': avg_ttk,
+						'score': score
+	}
+
+	return scenario_data
+
+
+def try_parse_stat_file(file_path):
+	# None for unreadable, malformed or truncated files instead of aborting a whole run
+	try:
+		return parse_stat_file(file_path)
+	except (OSError, StatFileError):
+		return None
@@ -0,0 +1,27 @@
+import os
+import hashlib
+
+
+def scenario_filename(folder, scenario_name, extension):
+	# a file name of folder derived from the scenario name hash, existing files are never overwritten
+	key = hashlib.sha1(scenario_name.encode()).hexdigest()[:16]
+	seq = 0
+	while os.path.exists(os.path.join(folder, f'{key}_{seq}{extension}')):
+		seq += 1
+
+	return f'{key}_{seq}{extension}'
+
+
+def folder_key(folder):
+	# the stats folder a stored index was built from, compared as an absolute path
+	return os.path.normcase(os.path.abspath(folder))
+
+
+def files_digest(stat_files):
+	# which stat files a stored index has read, not just how many
+	digest = hashlib.sha1()
+	for sf in stat_files:
+		digest.update(sf.filename.encode())
+		digest.update(b'\n')
+
+	return digest.hexdigest()
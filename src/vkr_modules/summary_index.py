@@ -0,0 +1,292 @@
+import os
+import json
+import bisect
+import datetime
+
+import numpy as np
+
+from vkr_modules.runs import RunBatch
+from vkr_modules.instrumentation import Instrumentation
+from vkr_modules.storage import scenario_filename, folder_key, files_digest
+
+
+def combine(count, mean, m2, values):
+	# Welford's running mean/variance, extended by a whole block of values at once (Chan et al.)
+	n = len(values)
+	if n == 0:
+		return count, mean, m2
+
+	block_mean = values.mean(axis=0)
+	block_m2 = ((values - block_mean)**2).sum(axis=0)
+
+	total = count + n
+	delta = block_mean - mean
+
+	return total, mean + delta * n / total, m2 + block_m2 + delta**2 * count * n / total
+
+
+def accumulate(total, values):
+	# running column sums, added row after row like numpy's own column sums so the averages match them exactly
+	return np.cumsum(np.vstack((total[np.newaxis], values)), axis=0)[-1]
+
+
+class ScenarioSummary:
+	# running summary of a scenario's sessions: count, mean and M2 (Welford), sum, max and min of every
+	# field over the closed sessions, the best single run and its date, the closed sessions themselves
+	# and the runs of the last session, which newer runs may still join
+	def __init__(self, session_threshold, archive_chunks):
+		self.session_threshold = session_threshold
+		# the history the summary was built from: archive chunks and stat files up to high_water
+		self.archive_chunks = archive_chunks
+		self.files = 0
+		self.digest = None
+		self.high_water = None
+		# files up to high_water that could not be read, they are read again with the newer ones
+		self.failed = []
+
+		self.count = 0
+		self.mean = np.zeros(len(RunBatch.fields))
+		self.m2 = np.zeros(len(RunBatch.fields))
+		self.sum = np.zeros(len(RunBatch.fields))
+		self.max = np.full(len(RunBatch.fields), -np.inf)
+		self.min = np.full(len(RunBatch.fields), np.inf)
+		# best single run
+		self.best_score = None
+		self.best_date = None
+
+		self.origin = None
+		self.open = None
+		self.sessions = []
+
+		# stat files still to be read, resumed summaries skip the archive and every file they already hold
+		self.pending = []
+		self.resumed = False
+
+	def add_runs(self, runs):
+		if len(runs) == 0:
+			return
+
+		i = int(np.argmax(runs['score']))
+		if self.best_score is None or runs['score'][i] > self.best_score:
+			self.best_score = float(runs['score'][i])
+			self.best_date = runs['date'][i]
+
+	def add_sessions(self, sessions):
+		# closed sessions, in date order
+		if len(sessions) == 0:
+			return
+
+		values = RunBatch(sessions).values()
+		self.count, self.mean, self.m2 = combine(self.count, self.mean, self.m2, values)
+		self.sum = accumulate(self.sum, values)
+		self.max = np.maximum(self.max, values.max(axis=0))
+		self.min = np.minimum(self.min, values.min(axis=0))
+		self.sessions.append(sessions)
+
+	def close(self, joiner, stat_files, failed):
+		# keeps the joiner's open session for the next update
+		self.origin = joiner.origin
+		self.open = joiner.open
+		self.files = len(stat_files)
+		self.digest = files_digest(stat_files)
+		self.high_water = stat_files[-1].date if len(stat_files) > 0 else None
+		self.failed = [sf.filename for sf in failed]
+
+	def get_sessions(self, last):
+		# every closed session plus the last one, closed by the caller
+		return RunBatch(np.concatenate(self.sessions + [last.array]))
+
+	def get_trends(self, last):
+		# all-time trends without going over the sessions, the last session is folded into a copy
+		values = last.values()
+		count, _, m2 = combine(self.count, self.mean, self.m2, values)
+		# the average from the sum, Welford's mean is off by a rounding error that can show at 2 decimals
+		averages = accumulate(self.sum, values) / count
+		stdevs = np.sqrt(m2 / (count - 1)) if count > 1 else np.zeros(len(RunBatch.fields))
+
+		if len(values) > 0:
+			maxs, mins = np.maximum(self.max, values.max(axis=0)), np.minimum(self.min, values.min(axis=0))
+		else:
+			maxs, mins = self.max, self.min
+
+		return {
+				'average': dict(zip(RunBatch.fields, averages.tolist())),
+				'stdev': dict(zip(RunBatch.fields, stdevs.tolist())),
+				'max': dict(zip(RunBatch.fields, maxs.tolist())),
+				'min': dict(zip(RunBatch.fields, mins.tolist()))
+		}
+
+	def to_entry(self, filename):
+		return {
+				'file': filename,
+				'threshold': self.session_threshold.total_seconds(),
+				'archive': self.archive_chunks,
+				'files': self.files,
+				'digest': self.digest,
+				'high_water': isoformat(self.high_water),
+				'failed': self.failed,
+				'origin': int(self.origin.astype('i8')) if self.origin is not None else None,
+				'count': self.count,
+				'mean': self.mean.tolist(),
+				'm2': self.m2.tolist(),
+				'sum': self.sum.tolist(),
+				'max': self.max.tolist(),
+				'min': self.min.tolist(),
+				'best_score': self.best_score,
+				'best_date': isoformat(self.best_date)
+		}
+
+	@classmethod
+	def from_entry(cls, entry, session_threshold, sessions, open_runs):
+		summary = cls(session_threshold, entry['archive'])
+		summary.files = entry['files']
+		summary.digest = entry['digest']
+		summary.high_water = fromisoformat(entry['high_water'])
+		summary.failed = entry['failed']
+
+		summary.count = entry['count']
+		summary.mean = np.array(entry['mean'])
+		summary.m2 = np.array(entry['m2'])
+		summary.sum = np.array(entry['sum'])
+		summary.max = np.array(entry['max'])
+		summary.min = np.array(entry['min'])
+		summary.best_score = entry['best_score']
+		summary.best_date = np.datetime64(entry['best_date'], 'us') if entry['best_date'] is not None else None
+
+		summary.origin = np.datetime64(entry['origin'], 'us') if entry['origin'] is not None else None
+		summary.open = open_runs
+		summary.sessions = [sessions]
+		summary.resumed = True
+
+		return summary
+
+
+class SummaryIndex:
+	# persisted per-scenario summaries of one stats folder, index.json plus one npy per scenario with its
+	# closed sessions and the runs of its open one. A summary is resumed as long as it was built with the
+	# same session threshold and archive chunks and the stats folder still has the same files (by name)
+	# up to its high-water mark: only the newer files are read then, along with the files that failed to parse last time
+	# (e.g. still being written). Those can only join the open session, a summary with an older one is
+	# rebuilt. Stat files are never rewritten by the game, a file changed in place after it was read
+	# successfully is not picked up.
+	version = 3
+	index_name = 'index.json'
+
+	def __init__(self, path_summaries, stats_folder, instrumentation=None):
+		self.path_summaries = path_summaries
+		self.stats_folder = folder_key(stats_folder)
+		self.path_index = os.path.join(self.path_summaries, SummaryIndex.index_name)
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+		self.scenarios = dict()
+		# replaced npy files, deleted once the index no longer points at them
+		self.obsolete = []
+		self.dirty = False
+
+		if os.path.isfile(self.path_index):
+			with open(self.path_index, 'r') as fp:
+				index = json.load(fp)
+
+			# summaries of another stats folder (or version) are dropped, their npy files with them
+			if index.get('version') == SummaryIndex.version and index.get('stats_folder') == self.stats_folder:
+				self.scenarios = index['scenarios']
+			else:
+				self.obsolete = [entry['file'] for entry in index.get('scenarios', dict()).values()]
+				self.dirty = True
+
+	def __contains__(self, scenario_name):
+		return scenario_name in self.scenarios
+
+	def resume(self, scenario_name, stat_files, session_threshold, archive_chunks):
+		entry = self.scenarios.get(scenario_name)
+
+		if entry is not None and entry['threshold'] == session_threshold.total_seconds() and entry['archive'] == archive_chunks:
+			high_water = fromisoformat(entry['high_water'])
+			known = 0 if high_water is None else bisect.bisect_right([sf.date for sf in stat_files], high_water)
+
+			if known == entry['files'] and files_digest(stat_files[:known]) == entry['digest']:
+				with self.instrumentation.stage('summaries'):
+					sessions, open_runs = self.read(entry)
+
+				failed = set(entry['failed'])
+				retried = [sf for sf in stat_files[:known] if sf.filename in failed]
+
+				# a deleted or unreadable npy only costs a rebuild of its scenario
+				if sessions is not None and (len(retried) == 0 or (open_runs is not None and retried[0].date >= open_runs['date'][0])):
+					summary = ScenarioSummary.from_entry(entry, session_threshold, sessions, open_runs)
+					summary.pending = retried + stat_files[known:]
+					self.instrumentation.count('summaries_resumed')
+
+					return summary
+
+		summary = ScenarioSummary(session_threshold, archive_chunks)
+		summary.pending = stat_files
+
+		return summary
+
+	def put(self, scenario_name, summary):
+		with self.instrumentation.stage('summaries'):
+			os.makedirs(self.path_summaries, exist_ok=True)
+
+			sessions = np.concatenate(summary.sessions) if len(summary.sessions) > 0 else np.empty(0, dtype=RunBatch.dtype)
+			filename = self.write(scenario_name, sessions, summary.open)
+
+			# a deleted npy's name may have been taken again by the new one
+			if scenario_name in self.scenarios and self.scenarios[scenario_name]['file'] != filename:
+				self.obsolete.append(self.scenarios[scenario_name]['file'])
+
+			self.scenarios[scenario_name] = summary.to_entry(filename)
+			self.dirty = True
+
+	def save(self):
+		if not self.dirty:
+			return
+
+		index = {'version': SummaryIndex.version, 'stats_folder': self.stats_folder, 'scenarios': self.scenarios}
+
+		# written aside and swapped in, like the archive index
+		path_tmp = self.path_index + '.tmp'
+		with open(path_tmp, 'w') as fp:
+			json.dump(index, fp)
+
+		os.replace(path_tmp, self.path_index)
+
+		for filename in self.obsolete:
+			path = os.path.join(self.path_summaries, filename)
+			if os.path.isfile(path):
+				os.remove(path)
+
+		self.obsolete = []
+		self.dirty = False
+
+	def write(self, scenario_name, sessions, open_runs):
+		# one uncompressed array per scenario, the closed sessions followed by the open session's runs
+		filename = scenario_filename(self.path_summaries, scenario_name, '.npy')
+
+		array = np.concatenate((sessions, open_runs)) if open_runs is not None else sessions
+		np.save(os.path.join(self.path_summaries, filename), array, allow_pickle=False)
+
+		return filename
+
+	def read(self, entry):
+		# (None, None) when the npy is gone or unreadable
+		try:
+			array = np.load(os.path.join(self.path_summaries, entry['file']), allow_pickle=False)
+		except (OSError, ValueError, EOFError):
+			return None, None
+
+		return array[:entry['count']], array[entry['count']:] if len(array) > entry['count'] else None
+
+
+def isoformat(date):
+	if date is None:
+		return None
+
+	if isinstance(date, np.datetime64):
+		return str(date.astype('datetime64[us]'))
+
+	return date.isoformat()
+
+
+def fromisoformat(date_str):
+	return datetime.datetime.fromisoformat(date_str) if date_str is not None else None
@@ -0,0 +1,245 @@
+import datetime
+
+import numpy as np
+
+from vkr_modules.playlist import Playlist
+from vkr_modules.scenario import Scenario
+from vkr_modules.stat_index import StatIndex
+from vkr_modules.parse_cache import ParseCache
+from vkr_modules.ingest import Ingestor
+from vkr_modules.graphs import GraphRenderer
+from vkr_modules import templates
+from vkr_modules.exceptions import NoStatFoundException
+
+
+class TeamReport:
+	# side by side report of several players: every stats folder is listed separately but parsed in one
+	# pass through a shared ingestor (same batches, pools and parse cache), each scenario then gets a
+	# columnar table of the players' summaries, percentiles within the team and an overlay graph
+	player_colors = ['#24DDD8', '#FFD700', '#EC44CA', '#85FA85', '#FF9900', '#B9F2FF', '#E62020', '#CCCCCC']
+
+	# one row per player with data for the scenario, player is the index in self.players
+	columns = np.dtype([('player', 'i4'), ('sessions', 'i4'), ('best', 'f8'), ('average', 'f8'), ('last20', 'f8'), ('trend', 'f8'), ('last_played', 'M8[us]')])
+
+	team_percentiles = [25, 50, 75, 90]
+
+	def __init__(self, players, root_folder, workers=None, instrumentation=None, resources_folder=None, progress=None, cancel_event=None, graphs=True, playlists=None, graph_resolution=None):
+		# players: [(name, stats folder)], the overlays are always pngs
+		self.players = players
+		self.workers = workers
+		self.graphs = graphs
+		self.graph_resolution = graph_resolution
+
+		# folders, assets, navigation and progress are those of a single-player report, which only lays out
+		# the pages here: its own pipeline (one stats folder, archive, summaries) is never opened
+		self.layout = Playlist(None, root_folder, workers, instrumentation, resources_folder, progress, cancel_event, graphs, Playlist.charts_png, playlists, graph_resolution)
+		self.instrumentation = self.layout.instrumentation
+		self.scoring = self.layout.scoring
+		self.path_index = self.layout.path_index
+
+		self.stat_indexes = None
+		self.parse_cache = None
+		self.ingestor = None
+		self.graph_renderer = None
+		# {scenario name: [summary or None, one per player]}
+		self.team_data = dict()
+		self.overlays = set()
+
+	def generate_folders(self):
+		self.layout.generate_folders()
+
+	def generate_reports(self):
+		self.open_pipeline()
+
+		try:
+			self.write_reports()
+		finally:
+			self.close_pipeline()
+
+	def open_pipeline(self):
+		self.instrumentation.start()
+
+		with self.instrumentation.stage('listing'):
+			self.stat_indexes = [StatIndex(stats_folder, absolute_paths=True) for _, stats_folder in self.players]
+
+		# stat files carry their full path, so one ingestor and one parse cache serve every player
+		self.parse_cache = ParseCache(self.layout.path_parse_cache)
+		self.ingestor = Ingestor('', self.parse_cache, self.workers, self.instrumentation)
+		if self.graphs:
+			self.graph_renderer = GraphRenderer(self.layout.path_imgs, self.workers, self.instrumentation, self.graph_resolution)
+
+		self.layout.copy_assets()
+
+	def close_pipeline(self):
+		self.ingestor.close()
+		self.parse_cache.close()
+		if self.graph_renderer is not None:
+			self.graph_renderer.close()
+		self.instrumentation.stop()
+		self.instrumentation.write(self.layout.path_timings)
+		self.stat_indexes = None
+		self.parse_cache = None
+		self.ingestor = None
+		self.graph_renderer = None
+
+	def write_reports(self):
+		layout = self.layout
+		playlists = layout.get_playlists()
+		pages = playlists.get_pages()
+		scenario_names = playlists.get_scenario_names()
+
+		layout.progress_done = 0
+		layout.progress_total = len(scenario_names) + len(pages)
+		self.team_data = dict()
+		self.overlays = set()
+
+		with self.instrumentation.stage('html'):
+			self.write_index()
+
+		self.process(scenario_names)
+		if self.graph_renderer is not None:
+			self.generate_overlays(scenario_names)
+
+		for page in pages:
+			layout.check_cancelled()
+
+			with self.instrumentation.stage('html'):
+				save_path = self.write_report(*page)
+
+			layout.report_progress('rank', playlists.page_label(*page), save_path)
+
+		with self.instrumentation.stage('html'):
+			self.write_index()
+
+	def process(self, scenario_names):
+		# every (scenario, player) pair in a single pass, the files of all the players share the parse batches
+		playlists = self.layout.get_playlists()
+		pairs = [(scenario_name, i) for scenario_name in scenario_names for i in range(len(self.players))]
+		file_groups = self.ingestor.iter_batches([self.stat_indexes[i].get_files(scenario_name) for scenario_name, i in pairs])
+
+		for (scenario_name, i), _ in zip(pairs, file_groups):
+			session_threshold = Playlist.session_thresholds[playlists.get_scenario_type(scenario_name)]
+			scenario = Scenario(scenario_name, self.stat_indexes[i], self.ingestor, session_threshold, self.instrumentation)
+
+			try:
+				data = scenario.process()
+			except NoStatFoundException:
+				data = None
+
+			self.team_data.setdefault(scenario_name, [None] * len(self.players))[i] = data
+
+			if i == len(self.players) - 1:
+				self.layout.scenario_processed(scenario_name)
+
+	def generate_overlays(self, scenario_names):
+		jobs = []
+
+		for scenario_name in scenario_names:
+			played = [i for i, data in enumerate(self.team_data[scenario_name]) if data is not None]
+
+			if len(played) > 0:
+				jobs.append((scenario_name,
+								[(self.players[i][0], self.team_data[scenario_name][i]['all']) for i in played],
+								20,
+								[self.player_color(i) for i in played]))
+				self.overlays.add(scenario_name)
+
+		# unchanged overlays from a previous run are skipped by the renderer
+		self.graph_renderer.render_overlays(jobs)
+
+	def compare(self, scenario_name):
+		rows = []
+
+		for i, data in enumerate(self.team_data.get(scenario_name, [])):
+			if data is not None:
+				rows.append((i, len(data['all']), data['best_score'], data['total_trends']['average']['score'],
+								data['last20_trends']['average']['score'], self.trend(data), data['all']['date'][-1]))
+
+		return np.array(rows, dtype=TeamReport.columns)
+
+	def write_index(self):
+		rows = [(name, stats_folder) for name, stats_folder in self.players]
+		content = templates.team_index.substitute(players=templates.data_table(rows), table=templates.data_table(self.instrumentation.summary()))
+
+		return self.layout.write_page(self.path_index, content)
+
+	def write_report(self, playlist_name, rank):
+		playlists = self.layout.get_playlists()
+		scenarios_template = playlists.get_template(playlist_name, rank)
+		content = []
+
+		for sc_type in [Playlist.tracking, Playlist.clicking, Playlist.switching]:
+			blocks = []
+
+			for sc_name in scenarios_template.get(sc_type, []):
+				table = self.compare(sc_name)
+
+				if len(table) == 0:
+					contents = 'Data not found.'
+				else:
+					thresholds = playlists.get_thresholds(playlist_name, sc_name)
+					contents = templates.team_data.substitute(graph=self.overlay_html(sc_name),
+																players=self.comparison_table(playlist_name, sc_name, table, thresholds),
+																percentiles=self.percentiles_table(table))
+
+				blocks.append(templates.scenario.substitute(name=templates.escape(sc_name), contents=contents))
+
+			content.append(templates.scenario_type.substitute(type=sc_type, title=sc_type.capitalize(), energy='', scenarios=''.join(blocks)))
+
+		return self.layout.write_page(self.layout.get_page_path(playlist_name, rank), ''.join(content))
+
+	def overlay_html(self, sc_name):
+		if sc_name not in self.overlays:
+			return ''
+
+		return templates.graph_img.substitute(src=templates.escape_attribute(f'../imgs/team_{sc_name}.png'))
+
+	def comparison_table(self, playlist_name, sc_name, table, thresholds):
+		# players by best score, percentiles are within the team
+		best_pct = TeamReport.percentile_ranks(table['best'])
+		last20_pct = TeamReport.percentile_ranks(table['last20'])
+		today = np.datetime64(datetime.datetime.now(), 'us')
+
+		headers = ['Player', 'Best', 'Pct', 'Last 20', 'Pct', 'Average', 'Trend', 'Sessions', 'Days ago']
+		if thresholds is not None:
+			headers.append('Rank')
+
+		rows = []
+		for j in np.argsort(-table['best'], kind='stable'):
+			entry = table[j]
+			row = [self.players[entry['player']][0],
+					templates.number(entry['best']), f'{best_pct[j]:.0f}',
+					templates.number(entry['last20']), f'{last20_pct[j]:.0f}',
+					templates.number(entry['average']), templates.signed(entry['trend']) if not np.isnan(entry['trend']) else '',
+					int(entry['sessions']), int((today - entry['last_played']) // np.timedelta64(1, 'D'))]
+
+			if thresholds is not None:
+				evaluation = self.scoring.evaluate((playlist_name, sc_name), thresholds, self.team_data[sc_name][entry['player']])
+				row.append((evaluation['best'] or 'Unranked').capitalize())
+
+			rows.append(row)
+
+		return templates.comparison_table(headers, rows)
+
+	def percentiles_table(self, table):
+		values = np.percentile(table['best'], TeamReport.team_percentiles)
+
+		return templates.data_table([(f'P{q}', templates.number(value)) for q, value in zip(TeamReport.team_percentiles, values)])
+
+	@staticmethod
+	def trend(data):
+		# NaN until the player has two full windows of sessions
+		return data['rolling']['trend'] if data['rolling']['trend'] is not None else np.nan
+
+	def player_color(self, i):
+		return TeamReport.player_colors[i % len(TeamReport.player_colors)]
+
+	@staticmethod
+	def percentile_ranks(values):
+		# share of the rest of the team each value is at or above, tied players share their rank
+		if len(values) < 2:
+			return np.full(len(values), 100.0)
+
+		at_or_below = np.searchsorted(np.sort(values), values, side='right') - 1
+
+		return at_or_below / (len(values) - 1) * 100
@@ -0,0 +1,94 @@
+import html
+import string
+
+# report page templates, filled with plain string substitution: the page skeleton and the
+# header/navbar are built once per run and every page is a single join of its fragments
+
+page = string.Template('<!DOCTYPE html><html><head>'
+						'<link rel="stylesheet" href="https://fonts.googleapis.com/css?family=PT+Sans" />'
+						'<link rel="stylesheet" href="$css" />'
+						'<title>Voltaic Fundamentals Report</title></head>'
+						'<body>$header<div class="main"><hr class="horizontal_separator" /></div>$content</body></html>')
+
+header = string.Template('<div class="header"><h1>Voltaic Fundamentals Report</h1>'
+							'<p>Made for Fundamental KvKs Routines 2.0 | Last update: $date</p></div>'
+							'$navbars')
+
+navbar = string.Template('<div class="navbar">$label$links</div>')
+
+playlist_label = string.Template('<span class="playlist">$name</span>')
+
+nav_link = string.Template('<a class="$rank" href="$href">$label</a>')
+
+index = string.Template('<div class="index_report"><h2>How to read the report</h2>'
+						'Each dot represents the average of a training session (taking into account the closest 2 hours since the start of the training), the continuous line its just a visual feedback to connect these dots.<br />'
+						'The dashed line represents the average of the last 20 training sessions for each scenario.<br />'
+						'The numbers on the X axis represents how many days ago that session was played.<br /><br />'
+						'Click on a rank button to get started.</div>'
+						'<div class="index_report"><h2>Report generation</h2>$table</div>')
+
+team_index = string.Template('<div class="index_report"><h2>Team</h2>$players</div>'
+							'<div class="index_report"><h2>How to read the report</h2>'
+							'Each scenario compares the players side by side: the graph shows every player\'s sessions as faint dots and the average of their last 20 sessions as a line, '
+							'the table ranks the players by best score with the percentile of each one within the team (100 is the top of the team).<br />'
+							'The numbers on the X axis represents how many days ago that session was played.<br /><br />'
+							'Click on a rank button to get started.</div>'
+							'<div class="index_report"><h2>Report generation</h2>$table</div>')
+
+scenario_type = string.Template('<div class="scenario_type $type"><h2>$title</h2>$energy$scenarios</div><hr class="horizontal_separator" />')
+
+energy = string.Template('<table class="data_table energy"><tr><th>Energy</th><td>$energy</td><th>Points</th><td>$points</td></tr></table>')
+
+scenario = string.Template('<div class="scenario"><div class="name"><h3>$name</h3></div><div class="contents">$contents</div></div>')
+
+scenario_data = string.Template('$graph<div class="data">'
+								'<div class="alltime"><h4>All-time</h4>$alltime</div>'
+								'<div class="last20"><h4>Last 20</h4>$last20</div>$ranking</div>')
+
+team_data = string.Template('$graph<div class="data comparison">'
+								'<div class="players"><h4>Players</h4>$players</div>'
+								'<div class="percentiles"><h4>Team best</h4>$percentiles</div></div>')
+
+ranking = string.Template('<div class="ranking"><h4>Rank</h4>$table</div>')
+
+graph_img = string.Template('<div class="graph"><img src="$src" /></div><hr class="vertical_separator" />')
+
+graph_canvas = string.Template('<div class="graph"><canvas data-chart="$index" class="chart" width="1000" height="200"></canvas></div><hr class="vertical_separator" />')
+
+charts = string.Template('<script type="application/json" id="chart_data">$data</script><script src="$src"></script>')
+
+
+def escape(value):
+	return html.escape(str(value), quote=False)
+
+
+def escape_attribute(value):
+	return html.escape(str(value), quote=True)
+
+
+def data_table(rows):
+	# [(label, value)], values are escaped here
+	cells = ''.join(f'<tr><th>{escape(label)}</th><td>{escape(value)}</td></tr>' for label, value in rows)
+
+	return f'<table class="data_table">{cells}</table>'
+
+
+def comparison_table(headers, rows):
+	# one header row and one row per entry, values are escaped here
+	header = ''.join(f'<th>{escape(label)}</th>' for label in headers)
+	cells = ''.join('<tr>' + ''.join(f'<td>{escape(value)}</td>' for value in row) + '</tr>' for row in rows)
+
+	return f'<table class="data_table comparison"><tr>{header}</tr>{cells}</table>'
+
+
+def number(n):
+	# 2 decimals, whole numbers without them
+	n = round(n, 2)
+
+	return int(n) if (10*n)%10==0 else n
+
+
+def signed(n):
+	n = number(n)
+
+	return f'+{n}' if n > 0 else n
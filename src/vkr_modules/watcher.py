@@ -0,0 +1,108 @@
+import os
+import time
+import queue
+import threading
+
+
+class StatWatcher:
+	# watches the stats folder for new stat files and calls callback(filenames) once a burst has settled,
+	# uses watchdog (inotify/ReadDirectoryChangesW) when it is installed and polls the folder otherwise
+	poll_interval = 1.0
+	debounce = 2.0
+
+	def __init__(self, stats_folder, callback, debounce=None, poll_interval=None, stop_event=None, use_watchdog=True):
+		self.stats_folder = stats_folder
+		self.callback = callback
+		self.debounce = debounce if debounce is not None else StatWatcher.debounce
+		self.poll_interval = poll_interval if poll_interval is not None else StatWatcher.poll_interval
+		self.stop_event = stop_event if stop_event is not None else threading.Event()
+		self.use_watchdog = use_watchdog
+
+		self.events = queue.Queue()
+		self.known = self.scan()
+		self.observer = None
+
+	def run(self):
+		# blocks until stop() or stop_event is set, the callback runs on this thread,
+		# files already there when the watcher was created are never reported
+		self.start_observer()
+		self.poll()
+
+		pending = set()
+		last_event = None
+
+		try:
+			while not self.stop_event.is_set():
+				if self.observer is None:
+					self.poll()
+
+				try:
+					filename = self.events.get(timeout=self.poll_interval)
+					pending.add(filename)
+					last_event = time.monotonic()
+
+					while not self.events.empty():
+						pending.add(self.events.get())
+				except queue.Empty:
+					pass
+
+				# a file is only handed over once no other one has shown up for self.debounce seconds,
+				# which also gives the game time to finish writing it
+				if len(pending) > 0 and time.monotonic() - last_event >= self.debounce:
+					filenames = sorted(pending)
+					pending = set()
+					self.callback(filenames)
+		finally:
+			self.stop_observer()
+
+	def stop(self):
+		self.stop_event.set()
+
+	def scan(self):
+		with os.scandir(self.stats_folder) as entries:
+			return {entry.name for entry in entries if entry.is_file() and entry.name.lower().endswith('.csv')}
+
+	def poll(self):
+		current = self.scan()
+
+		for filename in current - self.known:
+			self.events.put(filename)
+
+		self.known = current
+
+	def start_observer(self):
+		if not self.use_watchdog:
+			return
+
+		# optional dependency, polling works everywhere
+		try:
+			from watchdog.observers import Observer
+			from watchdog.events import FileSystemEventHandler
+		except ImportError:
+			return
+
+		events = self.events
+
+		class Handler(FileSystemEventHandler):
+			def on_created(self, event):
+				self.queue_path(event.src_path, event.is_directory)
+
+			def on_moved(self, event):
+				self.queue_path(event.dest_path, event.is_directory)
+
+			def queue_path(self, path, is_directory):
+				filename = os.path.basename(path)
+
+				if not is_directory and filename.lower().endswith('.csv'):
+					events.put(filename)
+
+		self.observer = Observer()
+		self.observer.schedule(Handler(), self.stats_folder, recursive=False)
+		self.observer.daemon = True
+		self.observer.start()
+
+	def stop_observer(self):
+		if self.observer is not None:
+			self.observer.stop()
+			self.observer.join()
+			self.observer = None